@@ -1,20 +1,33 @@
 import os
 import boto3
 import openai
+import requests
 import weaviate
-from weaviate.classes.init import Auth
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from weaviate.classes.init import Auth, AdditionalConfig, Timeout
 from semantic_router.encoders import OpenAIEncoder
 from slack_sdk import WebClient
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
 # Initialize API keys from environment variables
 calendar_id = os.getenv('GOOGLE_CALENDAR_ID')
 cerebras_api_key = os.getenv('CEREBRAS_API_KEY')
+custom_search_api_key = os.getenv('CUSTOM_SEARCH_API_KEY')
+custom_search_id = os.getenv('CUSTOM_SEARCH_ID')
 gemini_api_key = os.getenv('GEMINI_API_KEY')
 google_api_key = os.getenv('GOOGLE_API_KEY')
 erpnext_api_key = os.getenv('ERPNEXT_API_KEY') 
 erpnext_api_secret = os.getenv('ERPNEXT_API_SECRET') 
 openai_api_key = os.getenv('OPENAI_API_KEY')
 openrouter_api_key = os.getenv('OPENROUTER_API_KEY')
+redis_url = os.getenv('REDIS_URL')
 slack_bot_token = os.getenv('SLACK_BOT_TOKEN')
 telegram_bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
 weaviate_api_key = os.getenv('WEAVIATE_API_KEY')
@@ -63,6 +76,13 @@ USER_AGENTS = [
 
 # Initialize AWS services
 dynamodb = boto3.resource('dynamodb')
+# Pool sized above the TransferConfig concurrency so parallel uploads never wait on a connection
+s3_client = boto3.client('s3', config=Config(max_pool_connections=50, retries={'max_attempts': 3, 'mode': 'adaptive'}))
+
+# Uploads over 8 MB are sent as multipart uploads with parts in parallel
+s3_transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024, multipart_chunksize=16 * 1024 * 1024, max_concurrency=10, use_threads=True
+)
 
 # Initialize DynamoDB tables
 names_table = dynamodb.Table('slack_usernames')
@@ -77,11 +97,41 @@ user_table = 'UserMessages'
 image_bucket_name = 'mariaimagefolder-us'
 docs_bucket_name = 'mariadocsfolder-us'
 
-# Initialize OpenAI client
-client = openai.OpenAI(
-    api_key = os.getenv('OPENAI_API_KEY')
+# Redis backs Slack event dedupe and the embedding cache whenever REDIS_URL is set;
+# the LLM response caches are only used when ENABLE_LLM_CACHE is set as well
+enable_llm_cache = os.getenv('ENABLE_LLM_CACHE', '').lower() in ('1', 'true', 'yes')
+redis_client = (
+    redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    if redis and redis_url else None
 )
 
+# Shared keep-alive session for the model REST calls (OpenAI Responses, Cerebras, Gemini),
+# the Slack Web API and Slack/Telegram file downloads, so warm invocations skip the TCP and TLS handshake.
+# Idempotent requests (GET, HEAD) are retried on throttling and 5xx; POSTs are not, except to Gemini.
+# raise_on_status=False hands the last response back to the caller's own status checks.
+http_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+)
+http_session = requests.Session()
+http_session.mount('https://', http_adapter)
+http_session.mount('http://', http_adapter)
+# Gemini calls are plain generateContent requests, so retry them on throttling and 5xx
+http_session.mount('https://generativelanguage.googleapis.com/', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=2, backoff_factor=0.1, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=None, raise_on_status=False
+    )
+))
+
+# Initialize OpenAI client; async clients are built from the same options so they match its settings
+openai_client_options = {
+    'api_key': os.getenv('OPENAI_API_KEY')
+}
+client = openai.OpenAI(**openai_client_options)
+
 # Initialize OpenRouter client
 openrouter_client = openai.OpenAI(
     base_url="https://openrouter.ai/api/v1",
@@ -94,11 +144,17 @@ encoder = OpenAIEncoder(
 )
 
 # Initialize Weaviate client
+# Connections are kept open for the life of the container, so skip the
+# startup health checks and bound each call with explicit timeouts
+weaviate_additional_config = AdditionalConfig(timeout=Timeout(init=10, query=30, insert=60))
+
 def get_weaviate_client():
     return weaviate.connect_to_weaviate_cloud(
         cluster_url=weaviate_url,
         auth_credentials=Auth.api_key(weaviate_api_key),
-        headers=headers
+        headers=headers,
+        additional_config=weaviate_additional_config,
+        skip_init_checks=True
     )
 
 weaviate_client = get_weaviate_client()
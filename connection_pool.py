@@ -20,7 +20,8 @@ class WeaviateConnectionPool:
     """
     
     def __init__(self, cluster_url: str, api_key: str, headers: Dict[str, str], 
-                 pool_size: int = 5, max_overflow: int = 2, timeout: float = 30.0):
+                 pool_size: int = 5, max_overflow: int = 2, timeout: float = 30.0,
+                 additional_config=None):
         """
         Initialize the connection pool.
         
@@ -31,6 +32,7 @@ class WeaviateConnectionPool:
             pool_size: Number of connections to maintain in the pool
             max_overflow: Maximum number of overflow connections allowed
             timeout: Timeout for getting a connection from the pool
+            additional_config: Optional weaviate AdditionalConfig applied to every connection
         """
         self.cluster_url = cluster_url
         self.api_key = api_key
@@ -38,6 +40,7 @@ class WeaviateConnectionPool:
         self.pool_size = pool_size
         self.max_overflow = max_overflow
         self.timeout = timeout
+        self.additional_config = additional_config
         
         # Thread-safe queue for available connections
         self.pool = queue.Queue(maxsize=pool_size + max_overflow)
@@ -74,7 +77,9 @@ class WeaviateConnectionPool:
         client = weaviate.connect_to_weaviate_cloud(
             cluster_url=self.cluster_url,
             auth_credentials=Auth.api_key(self.api_key),
-            headers=self.headers
+            headers=self.headers,
+            additional_config=self.additional_config,
+            skip_init_checks=True
         )
         return client
     
@@ -193,7 +198,8 @@ _pool_lock = threading.Lock()
 
 
 def get_weaviate_pool(cluster_url: str, api_key: str, headers: Dict[str, str],
-                      pool_size: int = 5, max_overflow: int = 2) -> WeaviateConnectionPool:
+                      pool_size: int = 5, max_overflow: int = 2,
+                      additional_config=None) -> WeaviateConnectionPool:
     """
     Get or create the singleton Weaviate connection pool.
     
@@ -203,6 +209,7 @@ def get_weaviate_pool(cluster_url: str, api_key: str, headers: Dict[str, str],
         headers: Additional headers
         pool_size: Size of the connection pool
         max_overflow: Maximum overflow connections
+        additional_config: Optional weaviate AdditionalConfig applied to every connection
         
     Returns:
         WeaviateConnectionPool: The connection pool instance
@@ -216,7 +223,8 @@ def get_weaviate_pool(cluster_url: str, api_key: str, headers: Dict[str, str],
                 api_key=api_key,
                 headers=headers,
                 pool_size=pool_size,
-                max_overflow=max_overflow
+                max_overflow=max_overflow,
+                additional_config=additional_config
             )
     
     return _pool_instance
@@ -2,18 +2,22 @@ import json
 import time
 import datetime
 from cerebras_tool_converter import convert_tools_for_cerebras
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 import logging
 import requests
+import threading
 from typing import List, Dict, Any, Optional
 
-from config import client, openrouter_client, cerebras_api_key, ai_temperature, slack_bot_token, openai_api_key
+from config import client, openrouter_client, cerebras_api_key, ai_temperature, slack_bot_token, openai_api_key, http_session
 from tools import tools  # Import tools from tools.py
-from storage import decimal_default
+from storage import decimal_default, fast_json_dumps, fast_json_loads
 
 from slack_integration import send_slack_message, send_audio_to_slack
 from storage import save_message_weaviate
 
+# Follows the level lambda_function sets on the root logger (LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
 # Import the messaging router for unified message sending
 try:
     from messaging.router import get_global_router
@@ -23,6 +27,34 @@ except ImportError:
     print("Warning: MessageRouter not available, falling back to Slack-only messaging")
 
 
+# Message saves run off the reply path; lambda_handler flushes them before the invocation ends
+# because Lambda freezes background threads once the handler returns
+message_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="writer")
+_pending_writes = []
+_pending_writes_lock = threading.Lock()
+
+
+def save_message_in_background(*args):
+    """Queue save_message_weaviate(*args) on the shared writer and track it for flush_message_writes."""
+    future = message_writer.submit(save_message_weaviate, *args)
+    with _pending_writes_lock:
+        _pending_writes.append(future)
+    return future
+
+
+def flush_message_writes(timeout=10):
+    """Wait up to timeout seconds for every queued message save and log any that failed."""
+    with _pending_writes_lock:
+        pending = _pending_writes[:]
+        _pending_writes.clear()
+    done, not_done = wait(pending, timeout=timeout)
+    for future in done:
+        if future.exception():
+            print(f"Error saving message: {future.exception()}")
+    if not_done:
+        print(f"{len(not_done)} message saves still running after {timeout}s")
+
+
 def make_text_conversation(system_text, assistant_text, display_name, msg_history_summary, all_messages, text):
     current_datetime = datetime.datetime.now(datetime.timezone.utc)
     datetime_msg = f"Today is {current_datetime.strftime('%A %d %B %Y')} and the time is {current_datetime.strftime('%I:%M %p')} GMT. Use this to accurately understand statements involving relative time, such as 'tomorrow', 'last week', last year or any other reference of time."    
@@ -34,7 +66,7 @@ def make_text_conversation(system_text, assistant_text, display_name, msg_histor
 
     conversation.append({ 
         "role": "assistant", 
-        "content": (json.dumps(msg_history_summary, default=decimal_default))
+        "content": (fast_json_dumps(msg_history_summary, default=decimal_default))
     })
     
     # Add them to the conversation array   
@@ -66,7 +98,7 @@ def make_text_conversation(system_text, assistant_text, display_name, msg_histor
             "content": text
         })
 
-    print(json.dumps(conversation))         
+    logger.debug("Conversation: %s", conversation)
     
     return conversation 
 
@@ -88,7 +120,7 @@ def make_vision_conversation(system_text, assistant_text, display_name, all_rele
 
     conversation.append({ 
         "role": "assistant", 
-        "content": [{"type": "text", "text": json.dumps(all_relevant_messages, default=decimal_default)}]
+        "content": [{"type": "text", "text": fast_json_dumps(all_relevant_messages, default=decimal_default)}]
     })
 
     conversation.append({
@@ -98,7 +130,7 @@ def make_vision_conversation(system_text, assistant_text, display_name, all_rele
 
     conversation.append({ 
         "role": "assistant", 
-        "content": [{"type": "text", "text": json.dumps(msg_history_summary, default=decimal_default)}]
+        "content": [{"type": "text", "text": fast_json_dumps(msg_history_summary, default=decimal_default)}]
     })
 
     conversation.append({
@@ -130,7 +162,7 @@ def make_vision_conversation(system_text, assistant_text, display_name, all_rele
         }) 
         conversation.append({
             "role": "assistant",
-            "content": [{"type": "text", "text": json.dumps(models, default=decimal_default)}]
+            "content": [{"type": "text", "text": fast_json_dumps(models, default=decimal_default)}]
         })  
 
     conversation.append({
@@ -159,7 +191,7 @@ def make_vision_conversation(system_text, assistant_text, display_name, all_rele
             "content": user_content
         })
 
-    print(json.dumps(conversation))    
+    logger.debug("Conversation: %s", conversation)
     
     return conversation
 
@@ -185,12 +217,12 @@ def make_audio_conversation(system_text, assistant_text, display_name, all_relev
 
     conversation.append({ 
         "role": "assistant", 
-        "content": [{"type": "text", "text": json.dumps(all_relevant_messages, default=decimal_default)}]
+        "content": [{"type": "text", "text": fast_json_dumps(all_relevant_messages, default=decimal_default)}]
     })
 
     conversation.append({ 
         "role": "assistant", 
-        "content": [{"type": "text", "text": json.dumps(msg_history_summary, default=decimal_default)}]
+        "content": [{"type": "text", "text": fast_json_dumps(msg_history_summary, default=decimal_default)}]
     })
 
     # Add historical messages
@@ -211,7 +243,7 @@ def make_audio_conversation(system_text, assistant_text, display_name, all_relev
         }) 
         conversation.append({
             "role": "assistant",
-            "content": [{"type": "text", "text": json.dumps(models, default=decimal_default)}]
+            "content": [{"type": "text", "text": fast_json_dumps(models, default=decimal_default)}]
         })  
 
     conversation.append({
@@ -316,12 +348,12 @@ def make_cerebras_conversation(system_text, assistant_text, display_name, all_re
 
     conversation.append({ 
         "role": "assistant", 
-        "content": json.dumps(all_relevant_messages, default=decimal_default)
+        "content": fast_json_dumps(all_relevant_messages, default=decimal_default)
     })
 
     conversation.append({ 
         "role": "assistant", 
-        "content": json.dumps(msg_history_summary, default=decimal_default)
+        "content": fast_json_dumps(msg_history_summary, default=decimal_default)
     })
 
     # Add historical messages - simple string content only
@@ -352,7 +384,7 @@ def make_cerebras_conversation(system_text, assistant_text, display_name, all_re
     
     conversation.append(final_message)
 
-    print(json.dumps(conversation)) 
+    logger.debug("Conversation: %s", conversation)
     
     return conversation
 
@@ -491,7 +523,7 @@ def make_openai_gpt5_call(openai_api_key, conversations, tools=tools, verbosity=
         }
 
         # Make REST API call to OpenAI Responses endpoint
-        response = requests.post(
+        response = http_session.post(
             "https://api.openai.com/v1/responses",
             headers=headers,
             json=payload,
@@ -627,7 +659,7 @@ def ask_openai_o1(prompt):
         response_message_content = response.choices[0].message.content
 
         # Return the serialized content
-        return json.dumps(response_message_content, default=decimal_default)
+        return fast_json_dumps(response_message_content, default=decimal_default)
     except Exception as e:
         print(f"An error occurred during the OpenAI o1 API call: {e}")
         return None
@@ -683,7 +715,7 @@ def make_cerebras_call(conversations, model="gpt-oss-120b", max_tokens=5500):
 
         # Make the API call with a single retry on 429 token quota errors
         for attempt in range(3):  # 1st try + 1 retry
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = http_session.post(url, headers=headers, json=payload, timeout=30)
 
             if response.status_code == 200:
                 result = response.json()
@@ -753,6 +785,7 @@ def select_cerebras_tools(all_tools):
         "get_coordinates",
         "get_weather_data",
         "get_message_by_sort_id",
+        "get_messages_by_sort_ids",
         "get_messages_in_range",
         "get_users",
         "get_channels",
@@ -877,8 +910,8 @@ def handle_message_content(response_message, event_type, thread_ts, chat_id, aud
         else:
             assistant_reply = response_message.content
 
-    # Save the message
-    save_message_weaviate('AssistantMessages', chat_id, assistant_reply, thread_ts)
+    # Save the message in the background so sending the reply doesn't wait on the write
+    save_message_in_background('AssistantMessages', chat_id, assistant_reply, thread_ts)
 
     # Send the message using MessageRouter if available, otherwise fall back to Slack-only
     if MESSAGE_ROUTER_AVAILABLE:
@@ -977,12 +1010,12 @@ def handle_tool_calls(response_message, available_functions, chat_id, conversati
                     "tool_call_id": tool_call_id,
                     "role": "tool",
                     "name": function_name,
-                    "content": json.dumps(function_response),
+                    "content": fast_json_dumps(function_response),
                 }
 
             # Parse arguments safely
             try:
-                function_args = json.loads(function_arguments) if isinstance(function_arguments, str) else function_arguments
+                function_args = fast_json_loads(function_arguments) if isinstance(function_arguments, str) else function_arguments
             except Exception:
                 function_args = {}  # fall back if args are malformed
 
@@ -990,10 +1023,10 @@ def handle_tool_calls(response_message, available_functions, chat_id, conversati
             function_response = function_to_call(**(function_args or {}))
 
             if not isinstance(function_response, str):
-                function_response = json.dumps(function_response, default=decimal_default)
+                function_response = fast_json_dumps(function_response, default=decimal_default)
                 print(f"Function Response: {function_response}")
                 if function_name != "google_search" and "odoo" not in function_name:
-                    save_message_weaviate('AssistantMessages', chat_id, function_response, thread_ts)
+                    save_message_in_background('AssistantMessages', chat_id, function_response, thread_ts)
 
             return {
                 "tool_call_id": tool_call_id,
@@ -1016,7 +1049,7 @@ def handle_tool_calls(response_message, available_functions, chat_id, conversati
                 "tool_call_id": tool_call_id,
                 "role": "tool",
                 "name": function_name,
-                "content": json.dumps({"error": str(e)}),
+                "content": fast_json_dumps({"error": str(e)}),
             }
 
     # Use ThreadPoolExecutor to process tool calls in parallel
@@ -1,12 +1,8 @@
 import os
 import json
-import nltk
 import requests
 
 
-from nltk.tokenize import sent_tokenize, word_tokenize
-
-
 def calendar_operations(access_token, calendar_id, operation, event_id=None, event_data=None):
     base_url = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}"
     headers = {
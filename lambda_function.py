@@ -1,95 +1,75 @@
-import aiohttp
+import ast
 import asyncio
-import base64
 import boto3
 import calendar
 import concurrent.futures
 import csv
 import datetime
+import hashlib
 import json
 import logging
-import markdown2
+import math
 import mimetypes
-import nltk
+import numpy as np
 import openai
 import openpyxl
+import operator
 import os
-import PyPDF2
 import random
 import re
 import requests
 import tempfile
-import textwrap
+import threading
 import time
-import wave
 import weaviate
 import weaviate.classes as wvc
-import zipfile
 
 from amazon_functions import search_amazon_products, format_product_results, search_and_format_products
-from aiohttp.client_exceptions import ClientConnectorSSLError
+from array import array
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import NoCredentialsError
 from botocore.exceptions import ClientError
-from bs4 import BeautifulSoup
 from bson import ObjectId
-from collections import Counter
+from collections import Counter, defaultdict
 from datetime import timedelta, UTC
 from decimal import Decimal
-from docx import Document
-from html.parser import HTMLParser
+from functools import lru_cache
 from io import BytesIO, StringIO
 from odoo_functions import authenticate, odoo_get_mapped_models, odoo_get_mapped_fields, odoo_create_record, odoo_fetch_records, odoo_update_record, odoo_delete_record, odoo_print_record, odoo_post_record
 from openai import OpenAIError, BadRequestError
 from prompts import prompts  # Import the prompts from prompts.py
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, Table, TableStyle, KeepTogether
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY, TA_RIGHT
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.graphics.shapes import Drawing, Rect, Line
-from reportlab.graphics import renderPDF
-from semantic_router import Route
-from semantic_router import RouteLayer
-from semantic_router.encoders import OpenAIEncoder
 from tools import tools #Import tools from tools.py
 from typing import Dict, List, Optional, Union, Any
 from urllib.parse import urlparse, unquote, quote_plus, urlencode, urljoin
-from urllib.request import urlopen
 from weaviate.classes.init import Auth
 from weaviate.classes.query import Filter
 from weaviate.classes.query import Sort
-from xml.etree import ElementTree
 
 from config import *  # Import all configuration variables
-from parallel_utils import ParallelExecutor, time_operation, time_operation_with_metrics, log_performance_data
+from parallel_utils import ParallelExecutor, time_operation, time_operation_with_metrics, log_performance_data, send_metric
 from parallel_storage import (
+    fetch_recent_messages_parallel,
+    split_message_history,
     get_message_history_parallel,
     get_relevant_messages_parallel,
     parallel_preprocessing
 )
 from storage_pooled import init_weaviate_pool, get_pool_statistics
-
-# Initialize Weaviate connection pool at module level
-print("Initializing Weaviate connection pool...")
-init_weaviate_pool(pool_size=5, max_overflow=2)
 from extservices import get_coordinates
 from extservices import get_weather_data
-from nltk.tokenize import sent_tokenize, word_tokenize
 
 from conversation import (
     make_text_conversation, make_vision_conversation, make_audio_conversation, make_cerebras_conversation,
     make_openai_vision_call, make_openai_audio_call, ask_openai_o1, make_openrouter_call, make_cerebras_call,
-    serialize_chat_completion_message, handle_message_content, handle_tool_calls, make_openai_gpt5_call
+    serialize_chat_completion_message, handle_message_content, handle_tool_calls, make_openai_gpt5_call,
+    save_message_in_background, flush_message_writes
 )
 
 from media_processing import (
     text_to_speech, upload_image_to_s3, transcribe_speech_from_memory,
     download_audio_to_memory, process_url, transcribe_multiple_urls,
     convert_to_wav_in_memory, has_proper_sentences, EnhancedWebScraper,
-    gemini_generate_content
+    gemini_generate_content, upload_document_to_s3
 )
 
 from nlp_utils import (
@@ -100,7 +80,7 @@ from nlp_utils import (
 from slack_integration import (
     send_slack_message, send_audio_to_slack, send_file_to_slack,
     get_slack_user_name, update_slack_users, update_slack_conversations,
-    find_image_urls, latex_to_slack, message_to_json, process_slack_event,
+    find_image_urls, latex_to_slack, message_to_json, process_slack_event, normalize_display_name,
     send_typing_indicator, set_slack_channel_description, create_slack_channel,
     invite_users_to_slack_channel
 )
@@ -108,15 +88,25 @@ from slack_integration import (
 from storage import (
     save_message_weaviate, get_last_messages_weaviate, 
     get_relevant_messages, save_message, get_last_messages,
-    get_message_by_sort_id, get_messages_in_range, get_users, 
-    get_channels, manage_mute_status
+    get_message_by_sort_id, get_messages_by_sort_ids, get_messages_in_range, get_users, 
+    get_channels, manage_mute_status, fast_json_loads, fast_json_dumps
+)
+
+from semantic_cache import (
+    SEMANTIC_CACHE_ROUTES, semantic_cache_enabled, normalize_prompt, conversation_context,
+    lookup_cached_response, store_cached_response
 )
 
 from telegram_integration import (
     process_telegram_event, send_telegram_message, send_telegram_audio, send_telegram_file
 )
 
-nltk.data.path.append("/opt/python/nltk_data")
+# nltk is imported lazily by the summarizers and picks its data path up from the environment
+os.environ.setdefault("NLTK_DATA", "/opt/python/nltk_data")
+
+# Lambda attaches its handler to the root logger; LOG_LEVEL=DEBUG restores the verbose trace
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
 
 # Any remaining global variables that need to stay in the main file
 current_datetime = datetime.datetime.now(UTC)
@@ -124,27 +114,63 @@ current_datetime = datetime.datetime.now(UTC)
 # Create a global instance for drop-in replacement
 _scraper_instance = EnhancedWebScraper()
 
-# Connect to Weaviate Cloud
-weaviate_client = weaviate.connect_to_weaviate_cloud(
-    cluster_url=weaviate_url,
-    auth_credentials=Auth.api_key(weaviate_api_key),
-    headers = headers
-)
+# Most history any route asks for (summary_len + full_text_len), fetched before routing
+MAX_HISTORY_MESSAGES = 15
+
+# Slack user mention, e.g. <@U05SSQR07RS>
+MENTION_RE = re.compile(r"<@(\w+)>")
+
+# Worker threads for the handler's background work (history, preprocessing,
+# cache writes and typing indicators), kept alive across warm invocations
+phase1_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="phase1")
+
+# Runs a generated file's S3 upload alongside its Slack upload
+upload_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="upload")
+
+
+def refresh_slack_typing(chat_id, emoji='thinking'):
+    """Post a Slack typing indicator in the background; posting it should not delay the response."""
+    logger.debug("Starting typing indication for channel %s", chat_id)
+    phase1_executor.submit(send_typing_indicator, chat_id, duration=10, method="simulation", emoji=emoji)
+
+
+def skip_typing_indicator(chat_id, emoji='thinking'):
+    """Typing indicators are Slack-only; every other source gets this no-op."""
+
+
+def get_response_fields(response_message):
+    """Return (content, audio, tool_calls) from a dict or a typed message object."""
+    if isinstance(response_message, dict):
+        fields = response_message
+    else:
+        # Message objects keep their fields in the instance dict; read them all from one lookup
+        fields = getattr(response_message, "__dict__", None)
+        if fields is None:
+            return tuple(getattr(response_message, name, None) for name in ("content", "audio", "tool_calls"))
+    return fields.get("content"), fields.get("audio"), fields.get("tool_calls")
 
 
 @time_operation_with_metrics("lambda_handler_total")
 def lambda_handler(event, context):
-    print(f"Event: {event}")
+    try:
+        return handle_event(event, context)
+    except Exception:
+        # Drop the Slack claim so Slack's redelivery can retry the message
+        release_slack_event(event)
+        raise
+
+
+def handle_event(event, context):
+    logger.debug("Event: %s", event)
     
     # Periodically log connection pool statistics (10% of invocations)
     if random.random() < 0.1:
         try:
             pool_stats = get_pool_statistics()
-            print(f"Weaviate connection pool stats: {json.dumps(pool_stats)}")
+            logger.info("Weaviate connection pool stats: %s", pool_stats)
         except Exception as e:
-            print(f"Error getting pool stats: {e}")
+            logger.warning("Error getting pool stats: %s", e)
     
-    global stopwords
     global chat_id
     global user_id
     global thread_ts
@@ -152,7 +178,6 @@ def lambda_handler(event, context):
     global conversation
     global source
 
-    stopwords = load_stopwords('english')
     has_image = ''
     audio_text = ''
     has_audio = False
@@ -161,16 +186,15 @@ def lambda_handler(event, context):
     relevant = 5
     models = {}
 
-    rl = RouteLayer.from_json("routes_layer.json")
-
     # Get route (common processing)
     route_name = ""    
     
     
     if 'Records' in event and isinstance(event['Records'], list):
         source = "email"
+        typing_refresh = skip_typing_indicator
         payload = event['Records'][0]['body']
-        body_str = json.loads(payload)['payload']['event']
+        body_str = fast_json_loads(payload)['payload']['event']
         event_type = body_str['type']
         #print(f"Mail Body: {body_str}")
         system_text = prompts['system_text']
@@ -187,39 +211,47 @@ def lambda_handler(event, context):
         
         user = get_users(user_id)
         user_name = user['real_name']
-        display_name = user['display_name']
-        display_name = display_name.replace(' ', '_').replace('.', '').strip()
-        text = f"Email: {body_str} "
-        print(text)
+        display_name = normalize_display_name(user['display_name'])
+        # Hand the model the email as JSON rather than a Python dict repr
+        text = f"Email: {fast_json_dumps(body_str, default=decimal_default)} "
+        logger.debug("%s", text)
         conversation = make_vision_conversation(system_text, email_instructions,  display_name, '', '', '', text)
         response_message = make_openai_vision_call(client, conversation)
         
     else:
         body_str = event.get('body', '{}')
-        print(f"Body: {body_str}")
+        logger.debug("Body: %s", body_str)
         
         enable_pii = False
         
         # Parse the incoming event
-        parsed_body = json.loads(body_str)
+        parsed_body = fast_json_loads(body_str)
         
         # Detect source and process accordingly
         source = event.get('source', 'slack')  # Default to slack for backward compatibility
+        typing_refresh = refresh_slack_typing if source == 'slack' else skip_typing_indicator
         
         if source == 'telegram':
-            print("Processing Telegram event")
+            logger.debug("Processing Telegram event")
             processed_data = process_telegram_event(parsed_body)
         else:
             # Default to Slack processing (for backward compatibility)
-            print("Processing Slack event")
+            logger.debug("Processing Slack event")
+            if not claim_slack_event(parsed_body):
+                logger.info("Duplicate Slack event ignored")
+                send_metric("slack_dedupe_hits", 1, 'Count')
+                return {
+                    'statusCode': 200,
+                    'body': fast_json_dumps({'message': 'Duplicate ignored.'})
+                }
             processed_data = process_slack_event(parsed_body)
         
         # Check if processing was successful
         if processed_data is None:
-            print("Event processing failed or should be ignored")
+            logger.info("Event processing failed or should be ignored")
             return {
                 'statusCode': 200,
-                'body': json.dumps({'message': 'Ignored message.'})
+                'body': fast_json_dumps({'message': 'Ignored message.'})
             }
         
         # Extract processed parameters
@@ -227,9 +259,7 @@ def lambda_handler(event, context):
         thread_ts = processed_data['thread_ts']
 
         # REFRESH TYPING INDICATOR - since we're in the backend now
-        if source == 'slack':
-            print(f"Starting typing indication for channel {chat_id}") 
-            send_typing_indicator(chat_id, duration=10, method="simulation")
+        typing_refresh(chat_id)
 
         user_id = processed_data['user_id']
         user_name = processed_data['user_name']
@@ -241,32 +271,34 @@ def lambda_handler(event, context):
         application_files = processed_data['application_files']
         event_type = processed_data['event_type']
         
-        print(f"Processed {source} event - Chat ID: {chat_id}, User: {user_name}, Text: {text[:50]}...")
+        logger.debug("Processed %s event - Chat ID: %s, User: %s, Text: %.50s...", source, chat_id, user_name, text)
         
         # Append audio transcriptions and file contents to text (for both platforms)
         if audio_text:
             combined_audio_text = ' '.join(audio_text)
             text += f" {combined_audio_text}"
-            print(f"Added audio transcription to text: {combined_audio_text[:100]}...")
+            logger.debug("Added audio transcription to text: %.100s...", combined_audio_text)
         
         if application_files:
-            files_json = json.dumps(application_files)
+            files_json = fast_json_dumps(application_files)
             text += f" {files_json}"
-            print(f"Added application files to text: {len(application_files)} files")
+            logger.debug("Added application files to text: %d files", len(application_files))
         
+        # Start fetching history now so it overlaps with routing; it is trimmed per route below
+        history_future = phase1_executor.submit(fetch_recent_messages_parallel, chat_id, MAX_HISTORY_MESSAGES)
+
         if text:
             try:
-                route_choice = rl(text)
-                print(f'Route Choice: {route_choice}')
-                route_name = route_choice.name
-            except ValueError as e:
+                route_name = get_route_name(text)
+                logger.debug("Route Choice: %s", route_name)
+            except BadRequestError as e:
                 if "maximum context length" in str(e):
-                    print(f"Warning: Text exceeds maximum context length. Using fallback routing. Error: {e}")
+                    logger.warning("Text exceeds maximum context length. Using fallback routing. Error: %s", e)
                     route_name = "chitchat"
                 else:
                     raise
             except Exception as e:
-                print(f"Error in routing: {e}")
+                logger.error("Error in routing: %s", e)
                 route_name = "unknown_route"
 
         # Retrieve the last N messages from the user and assistant     
@@ -306,24 +338,19 @@ def lambda_handler(event, context):
         parallel_start_time = time.time()
         
         # PARALLEL EXECUTION PHASE 1: Message History & Initial Processing
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            # Submit parallel tasks
-            history_future = executor.submit(
-                get_message_history_parallel,
-                chat_id, num_messages, full_text_len
-            )
-            
-            # Prepare preprocessing parameters
-            enable_odoo = route_name == 'odoo_erp'
-            
-            preprocess_future = executor.submit(
-                parallel_preprocessing,
-                chat_id, text, route_name, relevant, enable_odoo
-            )
-            
-            # Get results
-            msg_history, all_messages, user_messages, assistant_messages = history_future.result()
-            preprocess_results = preprocess_future.result()
+        # Prepare preprocessing parameters
+        enable_odoo = route_name == 'odoo_erp'
+        
+        preprocess_future = phase1_executor.submit(
+            parallel_preprocessing,
+            chat_id, text, route_name, relevant, enable_odoo
+        )
+        
+        # Get results
+        msg_history, all_messages, user_messages, assistant_messages = split_message_history(
+            *history_future.result(), num_messages, full_text_len
+        )
+        preprocess_results = preprocess_future.result()
         
         # Log parallel processing time
         parallel_duration = (time.time() - parallel_start_time) * 1000
@@ -340,19 +367,20 @@ def lambda_handler(event, context):
         
         # Handle mute status
         try:
-            match_id = re.search(r"<@(\w+)>", text)
+            # Most messages have no mention, so skip the regex unless one could be present
+            match_id = MENTION_RE.search(text) if "<@" in text else None
             mentioned_user_id = match_id.group(1) if match_id else None
-            print(f"Maria muted: {maria_muted}")
+            logger.debug("Maria muted: %s", maria_muted)
             # Check if Maria is muted and the mentioned user is not the specified ID
             if maria_muted and mentioned_user_id != "U05SSQR07RS":
-                print("We are in the Maria is muted IF...")
+                logger.debug("Maria is muted; saving the message without replying")
                 save_message(meetings_table, chat_id, text, "user", thread_ts, image_urls)
                 return  # Exit the function after saving the message
         except Exception as e:
-            print(f"An unexpected error occurred: {e}")
+            logger.error("An unexpected error occurred: %s", e)
         
-        # Summarize message history
-        msg_history_summary = [summarize_messages(msg_history)]
+        # Summarize message history (nothing older than the full-text window means nothing to rank)
+        msg_history_summary = [summarize_messages(msg_history) if summary_len and msg_history else []]
         
         # Find image URLs
         has_image_urls, all_image_urls = find_image_urls(all_messages)
@@ -376,7 +404,20 @@ def lambda_handler(event, context):
             #response_message = make_openai_vision_call(client, conversation)
             response_message = make_openai_gpt5_call(openai_api_key, conversation)
         else:
-            if route_name in ['cerebras']:
+            # Close paraphrases of an earlier text-only question after the same assistant turn reuse its answer
+            cache_prompt = cache_embedding = cached_reply = None
+            if route_name in SEMANTIC_CACHE_ROUTES and semantic_cache_enabled():
+                cache_context = conversation_context(assistant_messages)
+                cache_prompt = normalize_prompt(text)
+                cache_embedding = get_embedding(cache_prompt)['embedding']
+                cached_reply = lookup_cached_response(chat_id, cache_context, cache_embedding)
+
+            if cached_reply is not None:
+                # A cached answer has no tool calls, so no conversation is needed
+                logger.info("Semantic cache hit for chat %s", chat_id)
+                conversation = None
+                response_message = {"role": "assistant", "content": cached_reply}
+            elif route_name in ['cerebras']:
                 # Regular vision conversation for text-only
                 conversation = make_cerebras_conversation(system_text, assistant_text, display_name, all_relevant_messages, msg_history_summary, all_messages, text, models)
                 #response_message = make_openrouter_call(openrouter_client, conversation)
@@ -386,22 +427,29 @@ def lambda_handler(event, context):
                 #response_message = make_openai_vision_call(client, conversation)
                 response_message = make_openai_gpt5_call(openai_api_key, conversation)
 
-    # Save the user's message to Database 
-    save_message_weaviate(user_table, chat_id, text, thread_ts, image_urls)
+            if cache_embedding is not None and cached_reply is None:
+                reply, _, reply_tool_calls = get_response_fields(response_message)
+                # Only plain answers are reusable; tool-call turns depend on live data
+                if reply and not reply_tool_calls:
+                    phase1_executor.submit(store_cached_response, chat_id, cache_context, cache_prompt, cache_embedding, reply)
+
+    # Save the user's message to Database in the background while the response is handled
+    save_message_in_background(user_table, chat_id, text, thread_ts, image_urls)
 
     # Define available functions dynamically based on source platform
     available_functions = get_available_functions(source)
 
+    # The follow-up model after tool calls only depends on the route and the images, so pick it once
+    if route_name in ['cerebras'] and not (image_urls or has_image_urls):
+        #make_followup_call = lambda conv: make_openrouter_call(openrouter_client, conv)
+        make_followup_call = make_cerebras_call
+    else:
+        #make_followup_call = lambda conv: make_openai_vision_call(client, conv)
+        make_followup_call = lambda conv: make_openai_gpt5_call(openai_api_key, conv)
+
     while True:
         # Handle message content if present
-        if isinstance(response_message, dict):
-            has_content = response_message.get("content")
-            has_audio = response_message.get("audio")
-            has_tool_calls = response_message.get("tool_calls")
-        else:
-            has_content = getattr(response_message, "content", None)
-            has_audio = getattr(response_message, "audio", None)
-            has_tool_calls = getattr(response_message, "tool_calls", None)
+        has_content, has_audio, has_tool_calls = get_response_fields(response_message)
 
         if has_content or has_audio:
             handle_message_content(response_message, event_type, thread_ts, chat_id, audio_text, source)
@@ -409,8 +457,7 @@ def lambda_handler(event, context):
         # Check and process tool calls
         if has_tool_calls:
             # REFRESH TYPING for tool processing
-            if source == 'slack' and chat_id:
-                send_typing_indicator(chat_id, duration=10, method="simulation", emoji='research')
+            typing_refresh(chat_id, emoji='research')
 
             conversation_with_tool_responses = handle_tool_calls(
                 response_message, available_functions, chat_id, conversation, thread_ts
@@ -419,20 +466,12 @@ def lambda_handler(event, context):
             if has_audio:
                 # Make sure to use the audio call for continued conversation
                 response_message = make_openai_audio_call(client, conversation_with_tool_responses)
-            elif image_urls or has_image_urls:
-                # Use vision for image-based conversations
-                #response_message = make_openai_vision_call(client, conversation_with_tool_responses)
-                response_message = make_openai_gpt5_call(openai_api_key, conversation_with_tool_responses)
             else:
-                if route_name in ['cerebras']:
-                    #response_message = make_openrouter_call(openrouter_client, conversation_with_tool_responses)
-                    response_message = make_cerebras_call(conversation_with_tool_responses)
-                else:
-                    #response_message = make_openai_vision_call(client, conversation_with_tool_responses)
-                    response_message = make_openai_gpt5_call(openai_api_key, conversation_with_tool_responses)
+                response_message = make_followup_call(conversation_with_tool_responses)
         else:
-
-            weaviate_client.close()
+            # Make sure the user's and assistant's messages were saved before the invocation ends
+            flush_message_writes(timeout=10)
+            # The Weaviate client stays open for reuse by the next warm invocation
             break  # Exit the loop if there are no tool calls    
 
     
@@ -443,7 +482,7 @@ def decimal_default(obj):
     elif isinstance(obj, ObjectId):
         return str(obj)  # Convert ObjectId to string
     raise TypeError("Unserializable object {} of type {}".format(obj, type(obj)))
-    
+
 
 def convert_floats_to_decimals(obj):
     if isinstance(obj, float):
@@ -455,10 +494,104 @@ def convert_floats_to_decimals(obj):
     return obj
     
     
+EMBEDDING_CACHE_TTL = 7 * 24 * 60 * 60
+
+
+def embedding_cache_key(model, text):
+    return "emb:" + hashlib.sha256(f"{model}|{text.strip().lower()}".encode()).hexdigest()
+
+
+def get_embeddings(texts, model="text-embedding-ada-002"):
+    """
+    Embed several texts in one request; results are aligned with the input order.
+    When Redis is configured, vectors are cached as float32 bytes and only misses are sent to the API.
+    """
+    texts_cleaned = [text.replace("\n", " ") for text in texts]
+    embeddings = [None] * len(texts_cleaned)
+
+    keys = [embedding_cache_key(model, text) for text in texts_cleaned]
+    if redis_client is not None:
+        try:
+            for i, raw in enumerate(redis_client.mget(keys)):
+                if raw is not None:
+                    embeddings[i] = array('f', raw).tolist()
+        except Exception as e:
+            logger.warning("Embedding cache read failed: %s", e)
+
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        response = client.embeddings.create(input=[texts_cleaned[i] for i in missing], model=model)
+        for i, item in zip(missing, sorted(response.data, key=lambda item: item.index)):
+            embeddings[i] = item.embedding
+
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for i in missing:
+                    pipe.setex(keys[i], EMBEDDING_CACHE_TTL, array('f', embeddings[i]).tobytes())
+                pipe.execute()
+            except Exception as e:
+                logger.warning("Embedding cache write failed: %s", e)
+
+    return [{"text": text, "embedding": embedding} for text, embedding in zip(texts_cleaned, embeddings)]
+
+
 def get_embedding(text, model="text-embedding-ada-002"):
-    text_cleaned = text.replace("\n", " ")
-    embedding = client.embeddings.create(input=[text_cleaned], model=model).data[0].embedding
-    return {"text": text_cleaned, "embedding": embedding}
+    return get_embeddings([text], model=model)[0]
+
+
+ROUTES_FILE = "routes_layer.json"
+# Used when a route in ROUTES_FILE leaves score_threshold unset
+DEFAULT_ROUTE_THRESHOLD = 0.3
+# Closest utterances whose scores are summed per route
+ROUTE_TOP_K = 5
+
+
+@lru_cache(maxsize=1)
+def load_route_index():
+    """
+    Embed the route utterances once per container.
+
+    Returns:
+        Tuple of (encoder model, unit-length utterance matrix as float32, route name per utterance row,
+        score threshold per route)
+    """
+    with open(ROUTES_FILE) as f:
+        routes_config = json.load(f)
+
+    utterances, names, thresholds = [], [], {}
+    for route in routes_config['routes']:
+        threshold = route.get('score_threshold')
+        thresholds[route['name']] = DEFAULT_ROUTE_THRESHOLD if threshold is None else threshold
+        utterances.extend(route['utterances'])
+        names.extend([route['name']] * len(route['utterances']))
+
+    model = routes_config['encoder_name']
+    matrix = np.asarray([item['embedding'] for item in get_embeddings(utterances, model=model)], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return model, matrix, names, thresholds
+
+
+def get_route_name(text):
+    """
+    Classify text against the routes in ROUTES_FILE with one matrix-vector product.
+
+    The ROUTE_TOP_K most similar utterances vote for their routes by summed score; the winning
+    route is returned if its best utterance clears the route's threshold, otherwise None.
+    """
+    model, matrix, names, thresholds = load_route_index()
+    query = np.asarray(get_embedding(text, model=model)['embedding'], dtype=np.float32)
+    scores = matrix @ (query / np.linalg.norm(query))
+
+    top = np.argpartition(scores, -ROUTE_TOP_K)[-ROUTE_TOP_K:] if len(scores) > ROUTE_TOP_K else range(len(scores))
+    totals = defaultdict(float)
+    best = defaultdict(float)
+    for i in top:
+        totals[names[i]] += float(scores[i])
+        best[names[i]] = max(best[names[i]], float(scores[i]))
+
+    route_name = max(totals, key=totals.get)
+    return route_name if best[route_name] >= thresholds[route_name] else None
 
 
 def send_to_sqs(data, queue_url):
@@ -469,7 +602,7 @@ def send_to_sqs(data, queue_url):
     
     sqs.send_message(
         QueueUrl=queue_url,
-        MessageBody=json.dumps(payload)
+        MessageBody=fast_json_dumps(payload, default=decimal_default)
     )
 
 def invoke_lambda(data):
@@ -480,17 +613,19 @@ def invoke_lambda(data):
     response = lambda_client.invoke(
         FunctionName='cerenyiWebsearch',
         InvocationType='RequestResponse',  # Changed to synchronous invocation
-        Payload=json.dumps(payload),
+        Payload=fast_json_dumps(payload, default=decimal_default),
     )
     
     # To get the response payload   
-    response_payload = json.loads(response['Payload'].read())
+    response_payload = fast_json_loads(response['Payload'].read())
     return response_payload
 
 
+@lru_cache(maxsize=8)
 def get_available_functions(source):
     """
     Get available functions based on the source platform.
+    The mapping is built once per platform and shared, so callers must not modify it.
     
     Args:
         source (str): The platform source ('slack', 'telegram', etc.)
@@ -505,6 +640,7 @@ def get_available_functions(source):
         "get_coordinates": get_coordinates,
         "get_weather_data": get_weather_data,
         "get_message_by_sort_id": get_message_by_sort_id,
+        "get_messages_by_sort_ids": get_messages_by_sort_ids,
         "get_messages_in_range": get_messages_in_range,
         "get_users": get_users,
         "get_channels": get_channels,
@@ -556,11 +692,12 @@ def get_available_functions(source):
     return all_functions
 
 
-def google_search(search_term, before=None, after=None, intext=None, allintext=None, and_condition=None, must_have=None):
-    # Initialize API keys from environment variables
-    custom_search_api_key = os.getenv('CUSTOM_SEARCH_API_KEY')
-    custom_search_id = os.getenv('CUSTOM_SEARCH_ID')
+# Reused across searches so the Custom Search connection stays warm
+google_search_session = requests.Session()
+google_search_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=10))
 
+
+def google_search(search_term, before=None, after=None, intext=None, allintext=None, and_condition=None, must_have=None):
     # Constructing the search term with advanced operators
     search_components = [search_term]
 
@@ -588,24 +725,18 @@ def google_search(search_term, before=None, after=None, intext=None, allintext=N
     if must_have:
         search_components.append(f"\"{must_have}\"")  # Use of escaped quotes to handle Python string encapsulation
 
-    # Join all components to form the final search query
+    # Join all components to form the final search query; requests handles the URL encoding
     combined_search_term = ' '.join(search_components)
-    url_encoded_search_term = quote_plus(combined_search_term)
-    print(f'Search Term: {url_encoded_search_term}')
-
-    # Build the search URL   
-    search_url = f"https://www.googleapis.com/customsearch/v1?q={url_encoded_search_term}&cx={custom_search_id}&key={custom_search_api_key}"
-    response = requests.get(search_url)
-    results = response.json().get('items', [])
-    #print(json.dumps(results, default=decimal_default))
-
-    web_links = []
-    for result in results:
-        web_links.append(result['link'])
+    logger.debug("Search Term: %s", combined_search_term)
+
+    # Only the first five results are fetched, so only ask for five
+    params = {'q': combined_search_term, 'cx': custom_search_id, 'key': custom_search_api_key, 'num': 5}
+    response = google_search_session.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=10)
+    items = response.json().get('items', [])[:5]
+    web_links = [item['link'] for item in items]
     
     # Assuming get_web_pages is a coroutine to fetch web pages 
-    web_content = asyncio.run(get_web_pages(web_links[:5]))
-    print(json.dumps(web_content, default=decimal_default))  # Assuming decimal_default was a function for JSON serializing decimals   
+    web_content = _scraper_instance.run(get_web_pages(web_links))
     
     return web_content
 
@@ -669,31 +800,35 @@ def search_conversation_history(chat_id, query_text, num_results=5):
         }
 
 
-def upload_document_to_s3(document_content, content_type, document_url):
-    document_extension = mimetypes.guess_extension(content_type) or '.bin'
-    s3_object_name = f"Document_{datetime.datetime.now(datetime.UTC).strftime('%Y%m%d%H%M%S')}{document_extension}"
+# Lowercase name indexes over get_users(), rebuilt at most every USER_INDEX_TTL seconds
+USER_INDEX_TTL = 300
+_user_index = {'built_at': 0.0, 'exact': {}, 'tokens': {}}
 
-    # Upload to S3   
-    s3_client = boto3.client('s3')
-    s3_client.put_object(Body=document_content, Bucket=docs_bucket_name, Key=s3_object_name)
 
-    # Construct the S3 URL  
-    s3_url = f"https://{docs_bucket_name}.s3.amazonaws.com/{s3_object_name}"
-    return s3_url
+def get_user_name_index():
+    """Return (exact, tokens) dicts mapping lowercase names and name words to users."""
+    global _user_index
+    index = _user_index
+    if time.monotonic() - index['built_at'] > USER_INDEX_TTL:
+        exact = defaultdict(list)
+        tokens = defaultdict(list)
+        for user in get_users() or []:
+            for name in (user.get('real_name', ''), user.get('display_name', '')):
+                name = name.lower()
+                exact[name].append(user)
+                for token in name.split():
+                    if token != name:
+                        tokens[token].append(user)
+        # Swap in a new dict so concurrent readers never see a half-built index
+        index = _user_index = {'built_at': time.monotonic(), 'exact': dict(exact), 'tokens': dict(tokens)}
+    return index['exact'], index['tokens']
 
 
 def smart_send_message(message, user_name):
-    users = get_users()  # Assume this function returns a list of user dictionaries  
-    matched_users = []
-    similar_users = []
-
-    for user in users:
-        names = [user.get('real_name', ''), user.get('display_name', '')]
-        for name in names:
-            if user_name.lower() == name.lower():
-                matched_users.append(user)
-            elif user_name.lower() in name.lower().split():
-                similar_users.append(user)
+    exact, tokens = get_user_name_index()
+    key = user_name.lower()
+    matched_users = exact.get(key, [])
+    similar_users = tokens.get(key, [])
 
     if len(matched_users) == 1:
         user_id = matched_users[0]['user_id']
@@ -707,474 +842,57 @@ def smart_send_message(message, user_name):
         return "No matching user found."
 
 
-class BeautifulPDFGenerator:
-    def __init__(self, title, page_size=letter, theme='professional'):
-        self.title = title
-        self.page_size = page_size
-        self.theme = theme
-        self.styles = getSampleStyleSheet()
-        self.story = []
-        self.themes = {
-            'professional': {
-                'primary_color': colors.HexColor('#2C3E50'),
-                'accent_color': colors.HexColor('#3498DB'),
-                'text_color': colors.HexColor('#2C3E50'),
-                'light_gray': colors.HexColor('#ECF0F1'),
-                'dark_gray': colors.HexColor('#7F8C8D')
-            },
-            'modern': {
-                'primary_color': colors.HexColor('#1A1A1A'),
-                'accent_color': colors.HexColor('#FF6B6B'),
-                'text_color': colors.HexColor('#333333'),
-                'light_gray': colors.HexColor('#F8F9FA'),
-                'dark_gray': colors.HexColor('#6C757D')
-            },
-            'corporate': {
-                'primary_color': colors.HexColor('#0F4C75'),
-                'accent_color': colors.HexColor('#3282B8'),
-                'text_color': colors.HexColor('#2C3E50'),
-                'light_gray': colors.HexColor('#E8F4FD'),
-                'dark_gray': colors.HexColor('#5A6C7D')
-            }
-        }
-        self._setup_beautiful_styles()
+# Markdown extras used when rendering PDFs
+PDF_MARKDOWN_EXTRAS = [
+    'fenced-code-blocks',
+    'tables',
+    'strike',
+    'task_list',
+    'spoiler',
+    'footnotes',
+    'header-ids'
+]
+
+# markdown2 converters keep per-conversion state, so each thread keeps its own instances
+_markdown_converters = threading.local()
+
+
+def get_markdown_converter(kind='plain'):
+    """Return this thread's cached markdown2 converter ('plain' or 'pdf')."""
+    converters = getattr(_markdown_converters, 'converters', None)
+    if converters is None:
+        converters = _markdown_converters.converters = {}
+    if kind not in converters:
+        import markdown2
+        converters[kind] = markdown2.Markdown(extras=PDF_MARKDOWN_EXTRAS if kind == 'pdf' else None)
+    return converters[kind]
+
+
+UNICODE_CLEANUP_TABLE = str.maketrans({
+    # Quotation marks
+    '\u2018': "'", '\u2019': "'", '\u201a': ",", '\u201b': "'",
+    '\u201c': '"', '\u201d': '"', '\u201e': ',,', '\u201f': '"',
     
-    def _setup_beautiful_styles(self):
-        """Setup beautiful, professional paragraph styles"""
-        theme_colors = self.themes.get(self.theme, self.themes['professional'])
-        
-        # Title page style
-        self.styles.add(ParagraphStyle(
-            name='DocumentTitle',
-            parent=self.styles['Title'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=theme_colors['primary_color'],
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Section headers with colored background
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading1'],
-            fontSize=16,
-            spaceBefore=25,
-            spaceAfter=15,
-            textColor=colors.white,
-            fontName='Helvetica-Bold',
-            backColor=theme_colors['primary_color'],
-            borderPadding=10,
-            leftIndent=10,
-            rightIndent=10
-        ))
-        
-        # Subsection headers
-        self.styles.add(ParagraphStyle(
-            name='SubsectionHeader',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceBefore=20,
-            spaceAfter=12,
-            textColor=theme_colors['accent_color'],
-            fontName='Helvetica-Bold',
-            borderWidth=0,
-            borderColor=theme_colors['accent_color'],
-            borderPadding=5,
-            leftIndent=5
-        ))
-        
-        # Minor headers
-        self.styles.add(ParagraphStyle(
-            name='MinorHeader',
-            parent=self.styles['Heading3'],
-            fontSize=13,
-            spaceBefore=15,
-            spaceAfter=10,
-            textColor=theme_colors['primary_color'],
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Body text with tighter spacing
-        self.styles.add(ParagraphStyle(
-            name='BeautifulBody',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceBefore=4,
-            spaceAfter=4,
-            alignment=TA_JUSTIFY,
-            leading=14,
-            textColor=theme_colors['text_color'],
-            fontName='Helvetica'
-        ))
-        
-        # SCQA section headers renamed to SectionHeader for any bold text ending with colon
-        self.styles.add(ParagraphStyle(
-            name='SCQAHeader',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            spaceBefore=12,
-            spaceAfter=6,
-            alignment=TA_LEFT,
-            leading=14,
-            textColor=theme_colors['primary_color'],
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Enhanced list style with tighter spacing
-        self.styles.add(ParagraphStyle(
-            name='BeautifulBullet',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceBefore=2,
-            spaceAfter=2,
-            leftIndent=25,
-            bulletIndent=15,
-            leading=14,
-            textColor=theme_colors['text_color'],
-            fontName='Helvetica'
-        ))
-        
-        # Quote/callout style with tighter spacing
-        self.styles.add(ParagraphStyle(
-            name='Callout',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceBefore=8,
-            spaceAfter=8,
-            leftIndent=20,
-            rightIndent=20,
-            alignment=TA_JUSTIFY,
-            leading=14,
-            textColor=theme_colors['text_color'],
-            backColor=theme_colors['light_gray'],
-            borderColor=theme_colors['accent_color'],
-            borderWidth=1,
-            borderPadding=10,
-            fontName='Helvetica-Oblique'
-        ))
-        
-        # Metadata/footer style
-        self.styles.add(ParagraphStyle(
-            name='Metadata',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceBefore=15,
-            spaceAfter=3,
-            alignment=TA_RIGHT,
-            textColor=theme_colors['dark_gray'],
-            fontName='Helvetica-Oblique'
-        ))
-
-    def _create_header_footer_canvas(self, canvas_obj, doc):
-        """Beautiful header and footer with styling"""
-        canvas_obj.saveState()
-        theme_colors = self.themes.get(self.theme, self.themes['professional'])
-        
-        # Header with colored line
-        canvas_obj.setStrokeColor(theme_colors['accent_color'])
-        canvas_obj.setLineWidth(2)
-        header_y = doc.height + doc.topMargin - 0.3 * inch
-        canvas_obj.line(doc.leftMargin, header_y, doc.width + doc.leftMargin, header_y)
-        
-        # Header text
-        canvas_obj.setFont('Helvetica-Bold', 11)
-        canvas_obj.setFillColor(theme_colors['primary_color'])
-        x_center = doc.width / 2 + doc.leftMargin
-        
-        if hasattr(canvas_obj, 'drawCentredText'):
-            canvas_obj.drawCentredText(x_center, header_y + 15, self.title)
-        else:
-            text_width = canvas_obj.stringWidth(self.title, 'Helvetica-Bold', 11)
-            canvas_obj.drawString(x_center - text_width/2, header_y + 15, self.title)
-        
-        # Footer with styled page numbers
-        canvas_obj.setStrokeColor(theme_colors['accent_color'])
-        canvas_obj.setLineWidth(1)
-        footer_y = doc.bottomMargin - 0.5 * inch
-        canvas_obj.line(doc.leftMargin, footer_y + 15, doc.width + doc.leftMargin, footer_y + 15)
-        
-        canvas_obj.setFont('Helvetica', 9)
-        canvas_obj.setFillColor(theme_colors['dark_gray'])
-        footer_text = f'Page {canvas_obj.getPageNumber()}'
-        
-        if hasattr(canvas_obj, 'drawCentredText'):
-            canvas_obj.drawCentredText(x_center, footer_y, footer_text)
-        else:
-            text_width = canvas_obj.stringWidth(footer_text, 'Helvetica', 9)
-            canvas_obj.drawString(x_center - text_width/2, footer_y, footer_text)
-        
-        canvas_obj.restoreState()
-
-    def add_title_page(self):
-        """Add a beautiful title page"""
-        theme_colors = self.themes.get(self.theme, self.themes['professional'])
-        
-        # Add some space
-        self.story.append(Spacer(1, 2*inch))
-        
-        # Main title
-        title_para = Paragraph(self.title, self.styles['DocumentTitle'])
-        self.story.append(title_para)
-        
-        # Decorative line
-        line_drawing = Drawing(400, 20)
-        line_drawing.add(Line(0, 10, 400, 10, strokeColor=theme_colors['accent_color'], strokeWidth=3))
-        self.story.append(line_drawing)
-        
-        self.story.append(Spacer(1, 1*inch))
-        
-    def add_image(self, image_path_or_url, width=None, height=None, caption=None):
-        """Add an image to the document with optional caption"""
-        try:
-            # Handle URLs
-            if image_path_or_url.startswith(('http://', 'https://')):
-                response = urlopen(image_path_or_url)
-                image_data = BytesIO(response.read())
-                img = Image(image_data)
-            # Handle base64 encoded images
-            elif image_path_or_url.startswith('data:image'):
-                header, data = image_path_or_url.split(',', 1)
-                image_data = BytesIO(base64.b64decode(data))
-                img = Image(image_data)
-            # Handle local file paths
-            else:
-                img = Image(image_path_or_url)
-            
-            # Set dimensions
-            if width and height:
-                img.drawWidth = width
-                img.drawHeight = height
-            elif width:
-                img.drawWidth = width
-                img.drawHeight = img.drawHeight * (width / img.drawWidth)
-            elif height:
-                img.drawHeight = height
-                img.drawWidth = img.drawWidth * (height / img.drawHeight)
-            else:
-                # Default max width
-                max_width = 5*inch
-                if img.drawWidth > max_width:
-                    img.drawHeight = img.drawHeight * (max_width / img.drawWidth)
-                    img.drawWidth = max_width
-            
-            # Center the image
-            img.hAlign = 'CENTER'
-            
-            self.story.append(Spacer(1, 10))
-            self.story.append(img)
-            
-            # Add caption if provided
-            if caption:
-                caption_style = ParagraphStyle(
-                    'ImageCaption',
-                    parent=self.styles['Normal'],
-                    fontSize=9,
-                    spaceAfter=15,
-                    alignment=TA_CENTER,
-                    textColor=self.themes[self.theme]['dark_gray'],
-                    fontName='Helvetica-Oblique'
-                )
-                self.story.append(Paragraph(f"<i>{caption}</i>", caption_style))
-            else:
-                self.story.append(Spacer(1, 10))
-                
-        except Exception as e:
-            # If image fails to load, add an error message
-            error_para = Paragraph(f"[Image could not be loaded: {str(e)}]", self.styles['BeautifulBody'])
-            self.story.append(error_para)
-
-    def write_html(self, html_content):
-        """Convert HTML content to beautiful ReportLab story elements"""
-        parser = BeautifulHTMLParser(self.styles, self)
-        parser.feed(html_content)
-        self.story.extend(parser.get_story())
-
-    def generate_pdf(self, output_path):
-        """Generate the beautiful PDF file"""
-        doc = SimpleDocTemplate(
-            output_path,
-            pagesize=self.page_size,
-            rightMargin=0.8*inch,
-            leftMargin=0.8*inch,
-            topMargin=1.2*inch,
-            bottomMargin=1*inch
-        )
-        
-        # Build the PDF with custom canvas for headers/footers
-        doc.build(
-            self.story, 
-            onFirstPage=self._create_header_footer_canvas,
-            onLaterPages=self._create_header_footer_canvas
-        )
-
-
-class BeautifulHTMLParser(HTMLParser):
-    """Enhanced HTML parser with image support and beautiful formatting"""
+    # Dashes and hyphens
+    '\u2013': '–', '\u2014': '—', '\u2010': '-', '\u2012': '-',
+    '\u2015': '———', '\u2053': '~',
     
-    def __init__(self, styles, pdf_generator):
-        super().__init__()
-        self.styles = styles
-        self.pdf_generator = pdf_generator
-        self.story = []
-        self.current_text = ""
-        self.tag_stack = []
-        self.list_level = 0
-        self.in_strong_section = False
-        
-    def handle_starttag(self, tag, attrs):
-        self.tag_stack.append((tag, dict(attrs)))
-        
-        # Handle images
-        if tag == 'img':
-            self._flush_current_text()
-            attrs_dict = dict(attrs)
-            src = attrs_dict.get('src', '')
-            alt = attrs_dict.get('alt', '')
-            width = attrs_dict.get('width')
-            height = attrs_dict.get('height')
-            
-            if width:
-                width = float(width.replace('px', '')) if 'px' in str(width) else float(width)
-            if height:
-                height = float(height.replace('px', '')) if 'px' in str(height) else float(height)
-                
-            self.pdf_generator.add_image(src, width, height, alt if alt else None)
-            return
-        
-        # Don't flush text for inline formatting tags
-        if tag in ['h1', 'h2', 'h3', 'p', 'ul', 'ol', 'blockquote', 'hr']:
-            self._flush_current_text()
-            
-        if tag == 'hr':
-            # Add a horizontal rule
-            theme_colors = self.pdf_generator.themes.get(self.pdf_generator.theme, self.pdf_generator.themes['professional'])
-            line_drawing = Drawing(400, 10)
-            line_drawing.add(Line(0, 5, 400, 5, strokeColor=theme_colors['accent_color'], strokeWidth=1))
-            self.story.append(line_drawing)
-            self.story.append(Spacer(1, 10))
-            
-        if tag in ['ul', 'ol']:
-            self.list_level += 1
-            
-    def handle_endtag(self, tag):
-        if self.tag_stack and self.tag_stack[-1][0] == tag:
-            self.tag_stack.pop()
-            
-        if tag in ['h1', 'h2', 'h3', 'p', 'li', 'blockquote']:
-            self._flush_current_text(tag)
-            
-        if tag in ['ul', 'ol']:
-            self.list_level = max(0, self.list_level - 1)
-            
-        if tag in ['strong', 'b']:
-            self.in_strong_section = False
-            
-    def handle_data(self, data):
-        self.current_text += data
-        
-    def _flush_current_text(self, end_tag=None):
-        """Convert accumulated text to appropriate beautiful paragraph style"""
-        if not self.current_text.strip():
-            self.current_text = ""
-            return
-            
-        text = self.current_text.strip()
-        
-        # Check for section headers (any bold text ending with colon) BEFORE applying formatting
-        is_section_header = False
-        if ('strong' in [tag for tag, _ in self.tag_stack] or 'b' in [tag for tag, _ in self.tag_stack]):
-            if text.endswith(':'):
-                is_section_header = True
-        
-        formatted_text = self._apply_beautiful_formatting(text)
-        
-        # Determine style based on current context
-        if 'h1' in [tag for tag, _ in self.tag_stack] or end_tag == 'h1':
-            style = self.styles['SectionHeader']
-        elif 'h2' in [tag for tag, _ in self.tag_stack] or end_tag == 'h2':
-            style = self.styles['SubsectionHeader']
-        elif 'h3' in [tag for tag, _ in self.tag_stack] or end_tag == 'h3':
-            style = self.styles['MinorHeader']
-        elif is_section_header:
-            style = self.styles['SCQAHeader']
-        elif 'blockquote' in [tag for tag, _ in self.tag_stack] or end_tag == 'blockquote':
-            style = self.styles['Callout']
-        elif 'li' in [tag for tag, _ in self.tag_stack] or end_tag == 'li':
-            style = self.styles['BeautifulBullet']
-            formatted_text = f"• {formatted_text}"
-        else:
-            # Check if this looks like metadata (prepared by, date, etc.)
-            if any(keyword in text.lower() for keyword in ['prepared by:', 'date:', 'author:', 'version:']):
-                style = self.styles['Metadata']
-            else:
-                style = self.styles['BeautifulBody']
-            
-        if formatted_text:
-            para = Paragraph(formatted_text, style)
-            
-            # Add some special handling for section breaks
-            if '---' in text:
-                theme_colors = self.pdf_generator.themes.get(self.pdf_generator.theme, self.pdf_generator.themes['professional'])
-                line_drawing = Drawing(400, 20)
-                line_drawing.add(Line(50, 10, 350, 10, strokeColor=theme_colors['accent_color'], strokeWidth=2))
-                self.story.append(Spacer(1, 8))
-                self.story.append(line_drawing)
-                self.story.append(Spacer(1, 8))
-            else:
-                self.story.append(para)
-            
-        self.current_text = ""
-        
-    def _apply_beautiful_formatting(self, text):
-        """Apply beautiful inline formatting"""
-        formatted_text = text
-        
-        # Apply formatting based on tag stack
-        for tag, attrs in self.tag_stack:
-            if tag in ['strong', 'b']:
-                # Don't double-wrap if already wrapped
-                if not formatted_text.startswith('<b>'):
-                    formatted_text = f"<b>{formatted_text}</b>"
-            elif tag in ['em', 'i']:
-                # Don't double-wrap if already wrapped  
-                if not formatted_text.startswith('<i>'):
-                    formatted_text = f"<i>{formatted_text}</i>"
-                
-        return formatted_text
-        
-    def get_story(self):
-        self._flush_current_text()
-        return self.story
+    # Spaces and breaks
+    '\u00A0': ' ', '\u2000': ' ', '\u2001': ' ', '\u2002': ' ',
+    '\u2003': ' ', '\u2004': ' ', '\u2005': ' ', '\u2006': ' ',
+    '\u2007': ' ', '\u2008': ' ', '\u2009': ' ', '\u200A': ' ',
+    '\u200B': '', '\u200C': '', '\u200D': '',
+    
+    # Symbols
+    '\u2022': '•', '\u2023': '‣', '\u2024': '.', '\u2025': '..',
+    '\u2026': '…', '\u2027': '‧', '\u2122': '™', '\u00A9': '©',
+    '\u00AE': '®', '\u2120': '℠',
+})
 
 
 def clean_unicode_text(text):
-    """Enhanced Unicode cleaning with more characters"""
-    replacements = {
-        # Quotation marks
-        '\u2018': "'", '\u2019': "'", '\u201a': ",", '\u201b': "'",
-        '\u201c': '"', '\u201d': '"', '\u201e': ',,', '\u201f': '"',
-        
-        # Dashes and hyphens
-        '\u2013': '–', '\u2014': '—', '\u2010': '-', '\u2012': '-',
-        '\u2015': '———', '\u2053': '~',
-        
-        # Spaces and breaks
-        '\u00A0': ' ', '\u2000': ' ', '\u2001': ' ', '\u2002': ' ',
-        '\u2003': ' ', '\u2004': ' ', '\u2005': ' ', '\u2006': ' ',
-        '\u2007': ' ', '\u2008': ' ', '\u2009': ' ', '\u200A': ' ',
-        '\u200B': '', '\u200C': '', '\u200D': '',
-        
-        # Symbols
-        '\u2022': '•', '\u2023': '‣', '\u2024': '.', '\u2025': '..',
-        '\u2026': '…', '\u2027': '‧', '\u2122': '™', '\u00A9': '©',
-        '\u00AE': '®', '\u2120': '℠',
-    }
-    
-    for original, replacement in replacements.items():
-        text = text.replace(original, replacement)
-    
-    return text
+    """Enhanced Unicode cleaning with more characters (single translate pass)"""
+    return text.translate(UNICODE_CLEANUP_TABLE)
 
 
 def send_as_pdf(text, chat_id, title, ts=None, theme='professional', include_title_page=False):
@@ -1192,65 +910,61 @@ def send_as_pdf(text, chat_id, title, ts=None, theme='professional', include_tit
     Returns:
         str: Status message indicating success or failure
     """
-    pdf_path = f"/tmp/{title}.pdf"
+    # The PDF is built and uploaded in memory; nothing is written to /tmp
+    pdf_buffer = BytesIO()
     
     try:
         # Clean the input text but preserve paragraph structure
         cleaned_text = clean_unicode_text(text)
         
-        # Convert Markdown to HTML with extended features
-        # DON'T collapse double newlines - they create paragraph breaks
-        html_content = markdown2.markdown(cleaned_text, extras=[
-            'fenced-code-blocks', 
-            'tables', 
-            'strike',
-            'task_list',
-            'spoiler',
-            'footnotes',
-            'header-ids'
-        ])
-        
-        # Create beautiful PDF
+        # Create beautiful PDF (ReportLab is only loaded once a PDF is requested)
+        from pdf_generator import BeautifulPDFGenerator, MarkdownIt
         pdf_generator = BeautifulPDFGenerator(title, theme=theme)
         
         # Add title page if requested
         if include_title_page:
             pdf_generator.add_title_page()
             
-        pdf_generator.write_html(html_content)
-        pdf_generator.generate_pdf(pdf_path)
+        if MarkdownIt is not None:
+            # Build flowables straight from the markdown token stream
+            pdf_generator.write_markdown(cleaned_text)
+        else:
+            # Convert Markdown to HTML with extended features
+            # DON'T collapse double newlines - they create paragraph breaks
+            pdf_generator.write_html(get_markdown_converter('pdf').convert(cleaned_text))
+        pdf_generator.generate_pdf(pdf_buffer)
         
-        # Upload to S3
-        try:
-            bucket_name = docs_bucket_name
-            folder_name = 'uploads'
-            file_key = f"{folder_name}/{title}.pdf"
-            s3_client = boto3.client('s3')
-            s3_client.upload_file(pdf_path, bucket_name, file_key)
-            s3_status = "uploaded to S3"
-        except NameError:
-            s3_status = "S3 upload skipped (docs_bucket_name not defined)"
-        except Exception as s3_error:
-            s3_status = f"S3 upload failed: {s3_error}"
+        def upload_to_s3(pdf_bytes):
+            try:
+                bucket_name = docs_bucket_name
+                folder_name = 'uploads'
+                file_key = f"{folder_name}/{title}.pdf"
+                s3_client.upload_fileobj(BytesIO(pdf_bytes), bucket_name, file_key, Config=s3_transfer_config)
+                return "uploaded to S3"
+            except NameError:
+                return "S3 upload skipped (docs_bucket_name not defined)"
+            except Exception as s3_error:
+                return f"S3 upload failed: {s3_error}"
+        
+        # Upload to S3 in the background while this thread uploads to Slack;
+        # S3 gets its own copy of the bytes since upload_fileobj may close its file
+        s3_future = upload_executor.submit(upload_to_s3, pdf_buffer.getvalue())
         
         # Upload to Slack
         try:
-            send_file_to_slack(pdf_path, chat_id, title, ts)
+            send_file_to_slack(pdf_buffer, chat_id, title, ts, file_name=f"{title}.pdf")
             slack_status = "sent to Slack"
         except NameError:
             slack_status = "Slack upload skipped (send_file_to_slack not defined)"
         except Exception as slack_error:
             slack_status = f"Slack upload failed: {slack_error}"
         
+        s3_status = s3_future.result()
+        
         status = f"Success: Beautiful PDF generated with {theme} theme, {s3_status}, and {slack_status}."
         
     except Exception as e:
         status = f"Failure: {str(e)}"
-        
-    finally:
-        # Clean up temporary file
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
             
     return status
 
@@ -1268,7 +982,7 @@ def parse_excel_data(data):
     try:
         # Try parsing as JSON first
         if isinstance(data, str) and (data.strip().startswith('[') or data.strip().startswith('{')):
-            parsed_data = json.loads(data)
+            parsed_data = fast_json_loads(data)
             if isinstance(parsed_data, list) and len(parsed_data) > 0:
                 if isinstance(parsed_data[0], dict):
                     headers = list(parsed_data[0].keys())
@@ -1500,8 +1214,7 @@ def send_as_excel(data, chat_id, title, ts=None, sheet_name='Sheet1', include_he
             bucket_name = docs_bucket_name
             folder_name = 'uploads'
             file_key = f"{folder_name}/{title}.xlsx"
-            s3_client = boto3.client('s3')
-            s3_client.upload_file(excel_path, bucket_name, file_key)
+            s3_client.upload_file(excel_path, bucket_name, file_key, Config=s3_transfer_config)
             s3_status = "uploaded to S3"
         except NameError:
             s3_status = "S3 upload skipped (docs_bucket_name not defined)"
@@ -1525,8 +1238,10 @@ def send_as_excel(data, chat_id, title, ts=None, sheet_name='Sheet1', include_he
 
     finally:
         # Clean up temporary file
-        if os.path.exists(excel_path):
-            os.remove(excel_path)
+        try:
+            os.unlink(excel_path)
+        except FileNotFoundError:
+            pass
 
     return status
 
@@ -1536,6 +1251,7 @@ class MyFPDF:
     """Compatibility class - redirects to BeautifulPDFGenerator"""
     def __init__(self, title):
         print("Warning: MyFPDF is deprecated. Use BeautifulPDFGenerator instead.")
+        from pdf_generator import BeautifulPDFGenerator
         self.generator = BeautifulPDFGenerator(title)
         
     def write_html(self, html):
@@ -1560,32 +1276,36 @@ def list_files(folder_prefix='uploads'):
     Returns:
     - A dictionary where each key is the file name and the value is the object URL.
     """
-    s3 = boto3.client('s3')
-    response = s3.list_objects_v2(Bucket=docs_bucket_name, Prefix=folder_prefix)
-
-    files = {}
-    if 'Contents' in response:
-        for obj in response['Contents']:
-            if not obj['Key'].endswith('/'):  # Exclude any subfolders
-                file_url = f"https://{docs_bucket_name}.s3.amazonaws.com/{obj['Key']}"
-                file_name = obj['Key'].split('/')[-1]  # Extract the file name from the key
-                files[file_name] = file_url
-
-    return files
+    # Paginate so folders with more than 1000 objects are not silently truncated
+    paginator = s3_client.get_paginator('list_objects_v2')
+    pages = paginator.paginate(Bucket=docs_bucket_name, Prefix=folder_prefix, PaginationConfig={'PageSize': 1000})
+
+    # Exclude any subfolders and key each URL by its file name
+    return {
+        key.rsplit('/', 1)[-1]: f"https://{docs_bucket_name}.s3.amazonaws.com/{key}"
+        for page in pages
+        for obj in page.get('Contents', [])
+        if not (key := obj['Key']).endswith('/')
+    }
     
 
-def ask_bighead(prompt, model_option='pro'):
-    model_map = {
-        'ultra': 'gemini-1.0-ultra-latest',
-        'pro': 'gemini-1.5-pro-latest',
-        'vision': 'gemini-pro-vision'
-    }
-    model = model_map.get(model_option.lower())
+GEMINI_MODEL_MAP = {
+    'ultra': 'gemini-1.0-ultra-latest',
+    'pro': 'gemini-1.5-pro-latest',
+    'vision': 'gemini-pro-vision'
+}
+
+
+def build_gemini_request(prompt, model_option, stream=False):
+    """Return the generateContent (or SSE streamGenerateContent) URL and request body for the given model option."""
+    model = GEMINI_MODEL_MAP.get(model_option.lower())
     if not model:
         raise ValueError(f'Invalid model option: {model_option}. Choose from "pro", or "vision".')
 
-    url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={gemini_api_key}'
-    headers = {'Content-Type': 'application/json'}
+    if stream:
+        url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?alt=sse&key={gemini_api_key}'
+    else:
+        url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={gemini_api_key}'
     data = {
         'contents': [{
             'parts': [{
@@ -1593,39 +1313,298 @@ def ask_bighead(prompt, model_option='pro'):
             }]
         }]
     }
+    return url, data
+
+
+def iter_gemini_stream_text(response):
+    """Yield the first candidate's text parts from a streamGenerateContent SSE response as they arrive."""
+    for line in response.iter_lines():
+        if not line.startswith(b'data:'):
+            continue
+        chunk = fast_json_loads(line[5:])
+        candidates = chunk.get('candidates')
+        if not candidates:
+            continue
+        for part in candidates[0].get('content', {}).get('parts', []):
+            if 'text' in part:
+                yield part['text']
+
+
+# Slack redelivers unacknowledged events after about 1 and 5 minutes, so claims outlive both retries
+SLACK_EVENT_CLAIM_TTL_MS = 600_000
+
+
+def slack_event_claim_key(slack_event):
+    event_data = slack_event.get('event') or {}
+    if 'ts' not in event_data:
+        return None
+    return f"inflight:{event_data.get('channel')}:{event_data['ts']}"
+
+
+def claim_slack_event(slack_event):
+    """
+    Claim a Slack event by channel and message ts so redeliveries and double-sends run the pipeline once.
+
+    Returns False if another invocation already claimed the event. Without Redis, or on a Redis
+    error, every event is treated as new.
+    """
+    key = slack_event_claim_key(slack_event)
+    if redis_client is None or key is None:
+        return True
+    try:
+        return bool(redis_client.set(key, "1", nx=True, px=SLACK_EVENT_CLAIM_TTL_MS))
+    except Exception as e:
+        logger.warning("Slack event claim failed: %s", e)
+        return True
+
+
+def release_slack_event(event):
+    """Release the claim taken by claim_slack_event for a Lambda event whose processing failed."""
+    if redis_client is None or 'Records' in event or event.get('source', 'slack') != 'slack':
+        return
+    try:
+        key = slack_event_claim_key(fast_json_loads(event.get('body', '{}')))
+        if key is not None:
+            redis_client.delete(key)
+    except Exception as e:
+        logger.warning("Slack event release failed: %s", e)
+
+
+LLM_CACHE_TTL = 3600
+
+
+def llm_cache_key(namespace, model, prompt):
+    return f"{namespace}:" + hashlib.sha256(f"{model}|{prompt}".encode()).hexdigest()
+
+
+def get_cached_llm_response(key):
+    """Return a cached LLM response, or None on a miss or when caching is off."""
+    if redis_client is None or not enable_llm_cache:
+        return None
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()  # Raises an HTTPError if the status is 4xx or 5xx   
-        response_json = response.json()
-        print(json.dumps(response_json))
-        if 'candidates' in response_json and response_json['candidates']:
-            first_candidate = response_json['candidates'][0]
-            if 'content' in first_candidate and 'parts' in first_candidate['content'] and first_candidate['content']['parts']:
-                response_text = first_candidate['content']['parts'][0]['text']
-                #print(response_text)
-                return to_markdown(response_text)
+        cached = redis_client.get(key)
+        return cached.decode() if cached is not None else None
+    except Exception as e:
+        logger.warning("LLM cache read failed: %s", e)
         return None
-    except requests.exceptions.HTTPError as e:
-        return f'HTTP error occurred: {e.response.text}'
+
+
+def cache_llm_response(key, response, ttl=LLM_CACHE_TTL):
+    if redis_client is None or not enable_llm_cache or not response:
+        return
+    try:
+        redis_client.setex(key, ttl, response)
+    except Exception as e:
+        logger.warning("LLM cache write failed: %s", e)
+
+
+def ask_bighead(prompt, model_option='pro'):
+    """
+    Query Gemini over the shared keep-alive session, streaming the answer over SSE.
+
+    Parameters:
+    prompt (str): The prompt to send.
+    model_option (str): One of 'ultra', 'pro' or 'vision'.
+    """
+    url, data = build_gemini_request(prompt, model_option, stream=True)
+    cache_key = llm_cache_key('bighead', GEMINI_MODEL_MAP[model_option.lower()], prompt)
+    cached = get_cached_llm_response(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        with http_session.post(url, json=data, timeout=(3, 30), stream=True) as response:
+            if response.status_code >= 400:
+                return f'HTTP error occurred: {response.text}'
+            response_text = ''.join(iter_gemini_stream_text(response))
+        html = to_markdown(response_text) if response_text else None
     except requests.exceptions.RequestException as e:
         return f'Request error occurred: {e}'
     except Exception as e:
         return f'An error occurred: {e}'
+
+    cache_llm_response(cache_key, html)
+    return html
         
 
+BULLET_TO_MARKDOWN = str.maketrans({'•': '  *'})
+
+
+@lru_cache(maxsize=256)
 def to_markdown(text):
-    text = text.replace('•', '  *')
-    indented_text = textwrap.indent(text, '> ', predicate=lambda _: True)
-    html = markdown2.markdown(indented_text)
+    lines = text.translate(BULLET_TO_MARKDOWN).splitlines(keepends=True)
+    indented_text = ''.join('> ' + line for line in lines)
+    html = get_markdown_converter().convert(indented_text)
     return html
      
         
+# Limits that keep a single solve_maths call from running for minutes or exhausting memory.
+# Sizes are checked before the expensive operation runs, not only on the result.
+MAX_MATHS_INT_BITS = 14000       # about 4,200 digits, under Python's int-to-str limit
+MAX_MATHS_LIST_LENGTH = 10000
+MAX_MATHS_FACTORIAL = 1500       # 1500! is just under MAX_MATHS_INT_BITS
+MAX_MATHS_ROUND_DIGITS = 1000
+
+
+def check_maths_int_bits(bits):
+    if bits > MAX_MATHS_INT_BITS:
+        raise ValueError(f"Result would exceed {MAX_MATHS_INT_BITS} bits")
+
+
+def int_bits(value):
+    return abs(value).bit_length() if isinstance(value, int) else 0
+
+
+def bounded_pow(base, exponent, modulus=None):
+    """pow() that refuses integer powers whose result would be too large."""
+    if modulus is not None:
+        return pow(base, exponent, modulus)
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        check_maths_int_bits(exponent * math.log2(abs(base)))
+    return pow(base, exponent)
+
+
+def bounded_multiply(left, right):
+    """Multiplication that refuses oversized integer products and list repetitions."""
+    if isinstance(left, list) or isinstance(right, list):
+        count = right if isinstance(left, list) else left
+        items = left if isinstance(left, list) else right
+        if isinstance(count, int) and len(items) * count > MAX_MATHS_LIST_LENGTH:
+            raise ValueError(f"List would exceed {MAX_MATHS_LIST_LENGTH} items")
+    else:
+        check_maths_int_bits(int_bits(left) + int_bits(right))
+    return left * right
+
+
+def bounded_round(number, ndigits=None):
+    if ndigits is not None and abs(ndigits) > MAX_MATHS_ROUND_DIGITS:
+        raise ValueError(f"ndigits must be within {MAX_MATHS_ROUND_DIGITS}")
+    return round(number, ndigits)
+
+
+def bounded_factorial(n):
+    if n > MAX_MATHS_FACTORIAL:
+        raise ValueError(f"factorial() argument must be at most {MAX_MATHS_FACTORIAL}")
+    return math.factorial(n)
+
+
+def bounded_comb(n, k):
+    # comb(n, k) < 2**n
+    check_maths_int_bits(n)
+    return math.comb(n, k)
+
+
+def bounded_perm(n, k=None):
+    # perm(n, k) <= n**k
+    check_maths_int_bits(int_bits(n) * (n if k is None else k))
+    return math.perm(n, k)
+
+
+def bounded_prod(iterable, start=1):
+    values = list(iterable)
+    check_maths_int_bits(int_bits(start) + sum(int_bits(value) for value in values))
+    return math.prod(values, start=start)
+
+
+def bounded_lcm(*integers):
+    # lcm is at most the product of its arguments
+    check_maths_int_bits(sum(int_bits(value) for value in integers))
+    return math.lcm(*integers)
+
+
+# Whitelisted operators, functions and constants available to solve_maths
+MATHS_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: bounded_multiply,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: bounded_pow
+}
+
+MATHS_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg
+}
+
+MATHS_NAMESPACE = {name: getattr(math, name) for name in dir(math) if not name.startswith('_')}
+# Integer functions whose cost grows with their arguments go through bounded wrappers;
+# sumprod is dropped since its element-wise products can't be bounded up front cheaply
+MATHS_NAMESPACE.pop('sumprod', None)
+MATHS_NAMESPACE.update({
+    'factorial': bounded_factorial,
+    'comb': bounded_comb,
+    'perm': bounded_perm,
+    'prod': bounded_prod,
+    'lcm': bounded_lcm,
+    'abs': abs,
+    'round': bounded_round,
+    'min': min,
+    'max': max,
+    'sum': sum,
+    'pow': bounded_pow,
+    'int': int,
+    'float': float
+})
+MATHS_FUNCTIONS = frozenset(map(id, MATHS_NAMESPACE.values()))
+
+
+def check_maths_value(value):
+    """Reject results that grew too large across statements (e.g. repeated doubling)."""
+    if isinstance(value, int):
+        check_maths_int_bits(int_bits(value))
+    elif isinstance(value, list) and len(value) > MAX_MATHS_LIST_LENGTH:
+        raise ValueError(f"List would exceed {MAX_MATHS_LIST_LENGTH} items")
+    return value
+
+
+def evaluate_maths_node(node, env):
+    """Evaluate a single whitelisted AST expression node against the variables in env."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return check_maths_value(node.value)
+    elif isinstance(node, ast.Name):
+        if node.id in env:
+            return env[node.id]
+        if node.id in MATHS_NAMESPACE:
+            return MATHS_NAMESPACE[node.id]
+        raise NameError(f"name '{node.id}' is not defined")
+    elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 'math':
+        if node.attr in MATHS_NAMESPACE and hasattr(math, node.attr):
+            return MATHS_NAMESPACE[node.attr]
+        raise AttributeError(f"math has no attribute '{node.attr}'")
+    elif isinstance(node, ast.BinOp) and type(node.op) in MATHS_BINARY_OPERATORS:
+        left = evaluate_maths_node(node.left, env)
+        right = evaluate_maths_node(node.right, env)
+        return check_maths_value(MATHS_BINARY_OPERATORS[type(node.op)](left, right))
+    elif isinstance(node, ast.UnaryOp) and type(node.op) in MATHS_UNARY_OPERATORS:
+        return MATHS_UNARY_OPERATORS[type(node.op)](evaluate_maths_node(node.operand, env))
+    elif isinstance(node, ast.Call) and not node.keywords:
+        function = evaluate_maths_node(node.func, env)
+        if id(function) not in MATHS_FUNCTIONS:
+            raise ValueError("Only math functions can be called")
+        return check_maths_value(function(*[evaluate_maths_node(arg, env) for arg in node.args]))
+    elif isinstance(node, (ast.List, ast.Tuple)):
+        return check_maths_value([evaluate_maths_node(element, env) for element in node.elts])
+    raise ValueError(f"Unsupported expression: {type(node).__name__}")
+
+
+@lru_cache(maxsize=512)
+def parse_maths_code(code):
+    """Parse maths code once; the model often resends identical snippets. The nodes are only read, never mutated."""
+    return tuple(ast.parse(code, mode='exec').body)
+
+
 def solve_maths(code: str, **params) -> dict:
     """
-    Execute the given code and return the result.
+    Evaluate the given maths code and return the resulting variables.
+
+    Only assignments and arithmetic expressions over numbers, the math module
+    and a few builtins (abs, round, min, max, sum, pow, int, float) are allowed.
+    The value of a trailing bare expression is returned as 'result'.
 
     Parameters:
-    - code (str): The Python code to execute.
+    - code (str): The Python code to evaluate.
     - **params: Any parameters that the code might need.
 
     Returns:
@@ -1633,24 +1612,37 @@ def solve_maths(code: str, **params) -> dict:
     """
     exec_env = {}
     exec_env.update(params)
-    
+
     try:
-        exec(code, {}, exec_env)
-        
+        for statement in parse_maths_code(code):
+            if isinstance(statement, ast.Assign) and all(isinstance(target, ast.Name) for target in statement.targets):
+                value = evaluate_maths_node(statement.value, exec_env)
+                for target in statement.targets:
+                    exec_env[target.id] = value
+            elif isinstance(statement, ast.AugAssign) and isinstance(statement.target, ast.Name):
+                binary = ast.BinOp(left=ast.Name(id=statement.target.id, ctx=ast.Load()), op=statement.op, right=statement.value)
+                exec_env[statement.target.id] = evaluate_maths_node(binary, exec_env)
+            elif isinstance(statement, ast.Expr):
+                exec_env['result'] = evaluate_maths_node(statement.value, exec_env)
+            else:
+                raise ValueError(f"Unsupported statement: {type(statement).__name__}")
+
         # Filter out non-serializable objects
         serializable_result = {key: value for key, value in exec_env.items() if is_serializable(value)}
-        
+
         return {"status": "success", "result": serializable_result}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+SERIALIZABLE_TYPES = (int, float, str, bool, list, dict, tuple, type(None))
+
 def is_serializable(value):
-    """Helper function to check if a value is serializable."""
-    try:
-        json.dumps(value)
-        return True
-    except (TypeError, OverflowError):
-        return False
+    """Helper function to check if a value is serializable, including the items of lists, tuples and dicts."""
+    if isinstance(value, (list, tuple)):
+        return all(is_serializable(item) for item in value)
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and is_serializable(item) for key, item in value.items())
+    return isinstance(value, SERIALIZABLE_TYPES)
 
 
 def normalize_message(response):
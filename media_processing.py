@@ -1,31 +1,69 @@
 import aiohttp
 import asyncio
 import base64
-import boto3
-import csv
-import datetime
 import json
 import logging
 import mimetypes
+import openai
 import openpyxl
 import os
 import PyPDF2
 import random
 import re
 import requests
+import shutil
 import tempfile
+import threading
+import time
 import warnings
 import wave
 from typing import Dict, Any
 
 from aiohttp import ClientError, ClientConnectorSSLError
-from bs4 import BeautifulSoup
-from config import client, slack_bot_token, image_bucket_name, docs_bucket_name, USER_AGENTS, gemini_api_key
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from config import client, openai_client_options, http_session, s3_client, s3_transfer_config, slack_bot_token, image_bucket_name, docs_bucket_name, USER_AGENTS, gemini_api_key
 from docx import Document
-from io import BytesIO, StringIO
+from functools import lru_cache
+from io import BytesIO
+from lxml import etree, html as lxml_html
 from urllib.parse import urlparse, urljoin, unquote
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# PDFium extracts text far faster than PyPDF2, which stays as the fallback
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# aiohttp can only decode brotli responses when the brotli package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SESSION_HEADERS = {'Accept-Encoding': 'gzip, deflate, br' if brotli else 'gzip, deflate'}
+# HEAD probes ask for the uncompressed size so the image size filter stays meaningful
+IDENTITY_ENCODING = {'Accept-Encoding': 'identity'}
+
+# Pages and documents larger than this are not downloaded
+MAX_PAGE_BYTES = 5_000_000
+
+# Successfully fetched pages are reused for this many seconds
+PAGE_CACHE_TTL = 300
+PAGE_CACHE_SIZE = 256
+
+# Short-lived fallback sessions in get_web_pages can still trip these on teardown
+warnings.filterwarnings("ignore", category=ResourceWarning)
+
 from nlp_utils import (
     load_stopwords, rank_sentences, summarize_record, summarize_messages,
     clean_website_data
@@ -34,14 +72,13 @@ from nlp_utils import (
 
 # Import additional dependencies for file processing
 try:
-    from nlp_utils import rank_sentences, load_stopwords
+    from nlp_utils import rank_sentences, load_stopwords, STOPWORDS_EN as stopwords
 except ImportError:
     def rank_sentences(text, stopwords, max_sentences=25):
         return text[:1000]  # Fallback
     def load_stopwords(language):
-        return []
-
-stopwords = load_stopwords('english')
+        return frozenset()
+    stopwords = frozenset()
 
 
 def text_to_speech(text, file_suffix=".mp3"):
@@ -67,26 +104,33 @@ def text_to_speech(text, file_suffix=".mp3"):
     return tmp_file_path
 
 
+@lru_cache(maxsize=64)
+def guess_file_extension(content_type):
+    """Cached mimetypes.guess_extension, defaulting to '.bin'."""
+    return mimetypes.guess_extension(content_type) or '.bin'
+
+
+def s3_object_timestamp():
+    """Millisecond epoch timestamp used to keep generated S3 object names unique."""
+    return f"{time.time_ns() // 1_000_000:013d}"
+
+
 def upload_image_to_s3(image_url, bucket_name):
     # Download the image   
     headers = {
         'Authorization': f'Bearer {slack_bot_token}',
         'Content-Type': 'image/x-www-form-urlencoded'
     }
-    response = requests.get(image_url, headers=headers)   
-
-    if response.status_code != 200:
-        raise Exception('Failed to download image')
-        
-    # Get the image content  
-    image_content = BytesIO(response.content)
-
     file_extension = os.path.splitext(image_url)[1]
-    s3_object_name = f"Maria_{datetime.datetime.now(datetime.UTC).strftime('%Y%m%d%H%M%S')}{file_extension}"
+    s3_object_name = f"Maria_{s3_object_timestamp()}{file_extension}"
 
-    # Upload to S3
-    s3_client = boto3.client('s3')
-    s3_client.upload_fileobj(image_content, bucket_name, s3_object_name)
+    # Stream the download straight into the S3 upload instead of holding the whole image in memory
+    with http_session.get(image_url, headers=headers, stream=True) as response:
+        if response.status_code != 200:
+            raise Exception('Failed to download image')
+
+        response.raw.decode_content = True
+        s3_client.upload_fileobj(response.raw, bucket_name, s3_object_name, Config=s3_transfer_config)
 
     # Construct the S3 URL    
     s3_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_object_name}"
@@ -104,22 +148,25 @@ def transcribe_speech_from_memory(audio_stream, audio_format='.m4a'):
     # Reset the stream's position to the beginning
     audio_stream.seek(0)
 
-    # Create a temporary file to store the audio content
-    with tempfile.NamedTemporaryFile(suffix=audio_format, delete=False) as tmp_file:
-        tmp_file.write(audio_stream.read())
-        tmp_file_path = tmp_file.name
+    # Upload straight from memory; the file name tells Whisper the audio format
+    response = client.audio.transcriptions.create(
+        model="whisper-1",
+        file=(f"audio{audio_format}", audio_stream, f"audio/{audio_format.lstrip('.')}")
+    )
+    return response.text
 
-    # Open the temporary file for reading
-    with open(tmp_file_path, 'rb') as audio_file:
-        # Create a transcription using OpenAI's Whisper model
-        response = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
 
-    # Remove the temporary file  
-    os.remove(tmp_file_path)
-    return response.text
+# Streamed downloads are copied in socket-sized reads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def read_response_into_memory(response):
+    """Copy a stream=True response body into a BytesIO, rewound for reading, without buffering it in requests first."""
+    buffer = BytesIO()
+    response.raw.decode_content = True
+    shutil.copyfileobj(response.raw, buffer, DOWNLOAD_CHUNK_SIZE)
+    buffer.seek(0)
+    return buffer
 
 
 def download_audio_to_memory(url):
@@ -127,26 +174,20 @@ def download_audio_to_memory(url):
         'Authorization': f'Bearer {slack_bot_token}',
         'Content-Type': 'audio/x-www-form-urlencoded'
     }    
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception('Failed to download audio')
-        
-    audio_content = BytesIO(response.content)
-    
-    response.raise_for_status()
-    return audio_content
+    with http_session.get(url, headers=headers, stream=True) as response:
+        if response.status_code != 200:
+            raise Exception('Failed to download audio')
+        return read_response_into_memory(response)
 
 
 def download_telegram_audio_to_memory(url):
     """
     Download audio from Telegram file URL (no authorization needed)
     """
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise Exception(f'Failed to download Telegram audio: {response.status_code}')
-        
-    audio_content = BytesIO(response.content)
-    return audio_content
+    with http_session.get(url, stream=True) as response:
+        if response.status_code != 200:
+            raise Exception(f'Failed to download Telegram audio: {response.status_code}')
+        return read_response_into_memory(response)
 
 
 def process_url(url, platform='slack'):
@@ -171,27 +212,99 @@ def process_telegram_url(url):
     return process_url(url, platform='telegram')
 
 
+# Downloads and Whisper uploads in flight at once per batch of audio URLs
+AUDIO_TRANSCRIBE_CONCURRENCY = 4
+
+
+async def transcribe_url_async(session, aclient, semaphore, url, platform='slack'):
+    """Download one audio file with aiohttp and transcribe it with the async OpenAI client; returns None on failure."""
+    if platform == 'telegram':
+        # Telegram voice messages are typically in OGG format and need no authorization
+        headers, audio_format = {}, '.ogg'
+    else:
+        # Slack audio files are typically in M4A format
+        headers, audio_format = {'Authorization': f'Bearer {slack_bot_token}'}, '.m4a'
+
+    try:
+        async with semaphore:
+            async with session.get(url, headers=headers) as response:
+                if response.status != 200:
+                    raise Exception(f'Failed to download audio: {response.status}')
+                audio_content = await response.read()
+            transcription = (await aclient.audio.transcriptions.create(
+                model="whisper-1",
+                file=(f"audio{audio_format}", audio_content, f"audio/{audio_format.lstrip('.')}")
+            )).text
+        print(f"Success: Transcription completed for URL: {url}")
+        return transcription
+    except Exception as e:
+        print(f"Failure: Could not process URL: {url}. Error: {str(e)}")
+        return None
+
+
+async def transcribe_urls_async(urls, platform='slack'):
+    semaphore = asyncio.Semaphore(AUDIO_TRANSCRIBE_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
+    # The async client's connection pool is bound to this event loop, so each batch opens its own;
+    # its uploads still share one keep-alive connection pool to the API
+    async with openai.AsyncOpenAI(**openai_client_options) as aclient:
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+            return await asyncio.gather(*(transcribe_url_async(session, aclient, semaphore, url, platform) for url in urls))
+
+
 def transcribe_multiple_urls(urls, platform='slack'):
-    results = []
+    """Transcribe several audio URLs concurrently; results follow the order of urls, with None for failures."""
     print(f'Transcribing audio from {platform}: {urls}')
-    with ThreadPoolExecutor() as executor:
-        if platform == 'telegram':
-            # Use Telegram-specific processing
-            future_to_url = {executor.submit(process_telegram_url, url): url for url in urls}
-        else:
-            # Use Slack processing (original behavior)
-            future_to_url = {executor.submit(process_url, url): url for url in urls}
-        
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                results.append(future.result())
-            except Exception as exc:
-                print(f'{url} generated an exception: {exc}')
+    if not urls:
+        return []
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        results = list(asyncio.run(transcribe_urls_async(urls, platform)))
+    else:
+        # Already inside an event loop; transcribe one by one instead
+        print("Concurrent transcription skipped: an event loop is already running")
+        results = [process_url(url, platform) for url in urls]
     print(results)
     return results
 
 
+WHITESPACE_RE = re.compile(r'\s+')
+
+# rank_sentences only keeps 50 sentences, so extraction stops once this much text is collected
+PDF_TEXT_BUDGET = 200_000
+
+
+def extract_pdf_text(data, budget=PDF_TEXT_BUDGET):
+    """
+    Return the text of a PDF given as bytes, page by page until about `budget` characters are collected.
+    Uses PDFium when pypdfium2 is installed.
+    """
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(data)
+        try:
+            page_texts = (page.get_textpage().get_text_range() for page in pdf)
+            return ' '.join(take_text_budget(page_texts, budget))
+        finally:
+            pdf.close()
+
+    pdf_reader = PyPDF2.PdfReader(BytesIO(data))
+    return ' '.join(take_text_budget((page.extract_text() for page in pdf_reader.pages), budget))
+
+
+def take_text_budget(page_texts, budget):
+    """Collect non-empty page texts until their total length passes budget; later pages are never extracted."""
+    collected = []
+    total = 0
+    for text in page_texts:
+        if text:
+            collected.append(text)
+            total += len(text)
+            if total > budget:
+                break
+    return collected
+
+
 def download_and_read_file(url, content_type, platform='slack'):
     """Download and read file content with platform-specific handling"""
     if platform == 'telegram':
@@ -205,72 +318,84 @@ def download_and_read_file(url, content_type, platform='slack'):
         }
     
     try:
-        response = requests.get(url, headers=headers)
+        response = http_session.get(url, headers=headers)
         response.raise_for_status()
         
         # Extract the original file name and extension from the URL    
         parsed_url = urlparse(url)
         original_file_name = os.path.basename(unquote(parsed_url.path))
-        _, file_extension = os.path.splitext(original_file_name)
 
         # Define the S3 bucket and folder where the file will be saved 
         bucket_name = docs_bucket_name
         folder_name = 'uploads'
 
-        # Use the original file extension for the temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-            tmp_file.write(response.content)
-            tmp_file.seek(0)
-            
-            # Upload the file to S3 with the original file name    
-            file_key = f"{folder_name}/{original_file_name}"
-            s3_client = boto3.client('s3')
-            s3_client.upload_file(tmp_file.name, bucket_name, file_key)
-
-            if 'text/csv' in content_type:
-                f = StringIO(response.text)
-                reader = csv.reader(f)
-                return '\n'.join([','.join(row) for row in reader])
-            elif 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' in content_type:
-                workbook = openpyxl.load_workbook(tmp_file.name)
+        # Upload the file to S3 with the original file name, straight from memory
+        file_key = f"{folder_name}/{original_file_name}"
+        s3_client.upload_fileobj(BytesIO(response.content), bucket_name, file_key, Config=s3_transfer_config)
+
+        if 'text/csv' in content_type:
+            # CSV is already plain text; return it as-is rather than re-tokenizing every cell
+            return response.text
+        elif 'text/plain' in content_type:
+            return response.text
+        elif not any(doc_type in content_type for doc_type in (
+                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                'application/pdf')):
+            return 'Unsupported file type'
+
+        # The document parsers all accept file-like objects, so read straight from memory
+        document = BytesIO(response.content)
+
+        if 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' in content_type:
+            # Stream the sheet with the read-only reader; values_only skips building Cell objects
+            workbook = openpyxl.load_workbook(document, read_only=True, data_only=True)
+            try:
                 sheet = workbook.active
-                return '\n'.join([','.join([str(cell.value) for cell in row]) for row in sheet.rows])
-            elif 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' in content_type:
-                doc = Document(tmp_file.name)
-                content = '\n'.join([p.text for p in doc.paragraphs])
-                summary = rank_sentences(content, stopwords, max_sentences=50)
+                return '\n'.join(','.join('' if value is None else str(value) for value in row) for row in sheet.iter_rows(values_only=True))
+            finally:
+                workbook.close()
+        elif 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' in content_type:
+            doc = Document(document)
+            content = '\n'.join([p.text for p in doc.paragraphs])
+            summary = rank_sentences(content, stopwords, max_sentences=50)
+            return summary
+        else:
+            text = extract_pdf_text(response.content)
+            # Remove excessive whitespace and newlines
+            cleaned_text = WHITESPACE_RE.sub(' ', text).strip()
+            print(f'PDF Contents: {cleaned_text}')
+            if has_proper_sentences(cleaned_text):
+                summary = rank_sentences(cleaned_text, stopwords, max_sentences=50)
                 return summary
-            elif 'application/pdf' in content_type:
-                pdf_reader = PyPDF2.PdfReader(tmp_file.name)
-                text = ' '.join([page.extract_text() for page in pdf_reader.pages if page.extract_text()])
-                # Remove excessive whitespace and newlines
-                cleaned_text = ' '.join(text.split())
-                print(f'PDF Contents: {cleaned_text}')
-                if has_proper_sentences(cleaned_text):
-                    summary = rank_sentences(cleaned_text, stopwords, max_sentences=50)
-                    return summary
-                else:                
-                    return cleaned_text
-            elif 'text/plain' in content_type:
-                with open(tmp_file.name, 'r') as f:
-                    content = f.read()
-                return content
-            else:
-                return 'Unsupported file type'
+            else:                
+                return cleaned_text
     except Exception as e:
         return f'Error processing file: {e}'
 
 
-def has_proper_sentences(text):
-    """Simple check for proper sentences"""
-    from nltk.tokenize import sent_tokenize
-    
-    sentences = sent_tokenize(text)
-    
-    # Check for sentences that end with proper punctuation and have reasonable length
-    proper_sentences = [s for s in sentences if s.strip().endswith(('.', '!', '?')) and len(s.split()) > 5]
-    
-    return len(proper_sentences) >= 2
+# Sentence terminators. The sentence checks only need a rough count, so splitting on these
+# replaces nltk's sent_tokenize (and loading punkt) on every scraped page. Each terminator is
+# found once by a single left-to-right scan, so long runs without punctuation stay linear.
+SENTENCE_END_RE = re.compile(r'[.!?]')
+WORD_CHAR_RE = re.compile(r'\w')
+
+
+def has_proper_sentences(text, required=2):
+    """
+    Simple check for proper sentences: at least `required` that end with proper punctuation
+    and have more than five words. Stops scanning as soon as enough are found.
+    """
+    found = 0
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        sentence = text[start:match.start()]
+        start = match.end()
+        if WORD_CHAR_RE.search(sentence) and len(sentence.split()) > 5:
+            found += 1
+            if found >= required:
+                return True
+    return False
 
 def convert_to_wav_in_memory(m4a_data):
     """
@@ -315,24 +440,44 @@ def convert_to_wav_in_memory(m4a_data):
         wav_buffer.close()
 
 
+# Builders for the content entries browse_internet returns
+def text_entry(payload):
+    return {"type": "text", "text": payload}
+
+
+def page_error_entry(url, error):
+    return text_entry({'url': url, 'error': error})
+
+
+def image_url_entry(url):
+    return {"type": "image_url", "image_url": {'url': url}}
+
+
+def resolve_image_url(src, base_url):
+    """Return an absolute URL for an image src, or None for empty and data: sources."""
+    if not src or src.startswith('data:'):
+        return None
+    return src if src.startswith(('http://', 'https://')) else urljoin(base_url, src)
+
+
 class EnhancedWebScraper:
     """Enhanced web scraper with content filtering to prevent problematic files"""
     
     def __init__(self):
         # Content type filtering
-        self.ALLOWED_CONTENT_TYPES = {
+        self.ALLOWED_CONTENT_TYPES = frozenset({
             'text/html',
             'text/plain',
             'application/xhtml+xml',
             'text/xml',
             'application/xml'
-        }
+        })
         
-        # File extensions to avoid
-        self.BLOCKED_EXTENSIONS = {
+        # File extensions to avoid (a tuple so one str.endswith call checks them all)
+        self.BLOCKED_EXTENSIONS = (
             '.counts', '.dat', '.bin', '.exe', '.zip', '.tar', '.gz',
             '.csv', '.tsv', '.json', '.log', '.db', '.sql'
-        }
+        )
         
         # URL patterns to avoid (data files, APIs, etc.)
         self.BLOCKED_URL_PATTERNS = [
@@ -347,6 +492,66 @@ class EnhancedWebScraper:
             r'/feed',
             r'googlelist\.counts'  # Specifically block the problematic file
         ]
+        self._blocked_url_re = re.compile('|'.join(self.BLOCKED_URL_PATTERNS), re.IGNORECASE)
+
+        # Line shapes typical of data files rather than prose, fused into one pattern
+        self.DATA_LINE_PATTERNS = [
+            r'^\d+\s+\w+\s*$',  # Number followed by word (like frequency data)
+            r'^\w+\s+\d+\s*$',  # Word followed by number
+            r'^\d+,\d+',        # CSV-like data
+            r'^\d+\t\w+',       # Tab-separated data
+            r'^\w+:\d+',        # Key:value pairs
+        ]
+        self._data_line_re = re.compile('|'.join(f'(?:{pattern})' for pattern in self.DATA_LINE_PATTERNS))
+
+        # The URL and content-type checks are pure and repeat across a crawl, so memoize them per scraper
+        self.should_process_url = lru_cache(maxsize=4096)(self.should_process_url)
+        self.is_content_type_allowed = lru_cache(maxsize=256)(self.is_content_type_allowed)
+
+        # Tags whose text is extracted from fetched pages
+        self.TEXT_ELEMENTS = ('p', 'li', 'summary', 'div', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'td', 'th', 'a')
+        self._text_selector = ','.join(self.TEXT_ELEMENTS)
+
+        # Precompiled lxml queries for when selectolax is not installed
+        self._text_xpath = etree.XPath(' | '.join(f'//{tag}' for tag in self.TEXT_ELEMENTS))
+        self._meta_xpath = etree.XPath('//meta[@name or @property]')
+        self._image_xpath = etree.XPath('//article//img/@src | //figure//img/@src | //section//img/@src')
+
+        # Background event loop and pooled session, shared across warm invocations
+        self._loop = None
+        self._session = None
+        self._loop_lock = threading.Lock()
+
+        # Recently fetched pages (url -> (fetched_at, result)) and fetches still in progress
+        self._page_cache = OrderedDict()
+        self._page_cache_lock = threading.Lock()
+        self._inflight = {}
+
+    def _get_loop(self):
+        """Start the background event loop on first use and return it."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="scraper-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _get_session(self):
+        """Return the pooled session, creating it on the background loop if needed."""
+        if self._session is None or self._session.closed:
+            # Image HEAD checks mostly hit the page's own host or CDN, so allow several per host
+            connector = aiohttp.TCPConnector(
+                limit=20,
+                limit_per_host=8,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=SESSION_HEADERS, auto_decompress=True)
+        return self._session
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
     
     def should_process_url(self, url):
         """Check if a URL should be processed based on various filters."""
@@ -355,16 +560,14 @@ class EnhancedWebScraper:
             
             # Check file extension
             path = parsed_url.path.lower()
-            for ext in self.BLOCKED_EXTENSIONS:
-                if path.endswith(ext):
-                    logging.info(f"Blocking URL due to extension: {url}")
-                    return False
+            if path.endswith(self.BLOCKED_EXTENSIONS):
+                logging.info(f"Blocking URL due to extension: {url}")
+                return False
             
             # Check URL patterns
-            for pattern in self.BLOCKED_URL_PATTERNS:
-                if re.search(pattern, url, re.IGNORECASE):
-                    logging.info(f"Blocking URL due to pattern match: {url}")
-                    return False
+            if self._blocked_url_re.search(url):
+                logging.info(f"Blocking URL due to pattern match: {url}")
+                return False
             
             return True
         except Exception as e:
@@ -385,31 +588,18 @@ class EnhancedWebScraper:
         # Take a sample of the text to analyze
         sample = text[:sample_size]
         
-        # Check for common data file patterns
-        data_patterns = [
-            r'^\d+\s+\w+\s*$',  # Number followed by word (like frequency data)
-            r'^\w+\s+\d+\s*$',  # Word followed by number
-            r'^\d+,\d+',        # CSV-like data
-            r'^\d+\t\w+',       # Tab-separated data
-            r'^\w+:\d+',        # Key:value pairs
-        ]
+        # Check the first 20 non-blank lines against the common data file patterns
+        lines = [line for line in (line.strip() for line in sample.split('\n')[:20]) if line]
         
-        lines = sample.split('\n')[:20]  # Check first 20 lines
+        # If more than 70% of lines match data patterns, it's likely a data file; stop once that is certain
+        threshold = len(lines) * 0.7
         data_line_count = 0
-        
         for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            for pattern in data_patterns:
-                if re.match(pattern, line):
-                    data_line_count += 1
-                    break
-        
-        # If more than 70% of lines match data patterns, it's likely a data file
-        total_lines = len([l for l in lines if l.strip()])
-        return total_lines > 0 and data_line_count > total_lines * 0.7
+            if self._data_line_re.match(line):
+                data_line_count += 1
+                if data_line_count > threshold:
+                    return True
+        return False
     
     def enhanced_has_proper_sentences(self, text):
         """Enhanced version of your has_proper_sentences function with additional validation."""
@@ -421,14 +611,100 @@ class EnhancedWebScraper:
             return False
         
         # Use your original logic
-        from nltk.tokenize import sent_tokenize
-        sentences = sent_tokenize(text)
-        
-        # Check for sentences that end with proper punctuation and have reasonable length
-        proper_sentences = [s for s in sentences if s.strip().endswith(('.', '!', '?')) and len(s.split()) > 5]
-        return len(proper_sentences) >= 2
+        return has_proper_sentences(text)
     
+    def extract_page_content(self, html):
+        """
+        Extract the text, author, publish date and article image sources from a page.
+        Uses selectolax's lexbor parser when it is installed and falls back to lxml.
+        """
+        if LexborHTMLParser is not None:
+            try:
+                tree = LexborHTMLParser(html)
+                text = ' '.join(node.text().strip() for node in tree.css(self._text_selector))
+                metas = self._collect_meta(node.attributes for node in tree.css('meta'))
+                image_sources = [img.attributes.get('src') for img in tree.css('article img, figure img, section img')]
+                return (
+                    text,
+                    metas.get('author') or 'Unknown',
+                    metas.get('article:published_time') or 'Unknown',
+                    image_sources
+                )
+            except Exception as e:
+                logging.error(f"selectolax parsing failed, falling back to lxml: {e}")
+
+        try:
+            root = lxml_html.fromstring(html)
+        except (etree.ParserError, ValueError) as e:
+            logging.error(f"Failed to parse page: {e}")
+            return '', 'Unknown', 'Unknown', []
+
+        # Query the lxml tree directly; no per-node Python wrapper objects as with BeautifulSoup
+        text = ' '.join(element.text_content().strip() for element in self._text_xpath(root))
+        metas = self._collect_meta(meta.attrib for meta in self._meta_xpath(root))
+        return (
+            text,
+            metas.get('author') or 'Unknown',
+            metas.get('article:published_time') or 'Unknown',
+            [str(src) for src in self._image_xpath(root)]
+        )
+
+    @staticmethod
+    def _collect_meta(meta_attributes):
+        """Map each meta tag's name (or property) to its content in one pass; the first tag wins."""
+        metas = {}
+        for attributes in meta_attributes:
+            key = attributes.get('name') or attributes.get('property')
+            if key and key not in metas:
+                metas[key] = attributes.get('content') or ''
+        return metas
+
     async def fetch_page(self, session, url, timeout=60):
+        """
+        Fetch a page, reusing a recent result or joining a fetch of the same URL
+        that is already running on this event loop.
+        """
+        cached = self._get_cached_page(url)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(url)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._fetch_page(session, url, timeout))
+            self._inflight[url] = task
+            task.add_done_callback(lambda done, url=url: self._finish_fetch(url, done))
+        # Shield so one caller being cancelled doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _get_cached_page(self, url):
+        with self._page_cache_lock:
+            entry = self._page_cache.get(url)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > PAGE_CACHE_TTL:
+                del self._page_cache[url]
+                return None
+            return entry[1]
+
+    def _finish_fetch(self, url, task):
+        """Drop a finished fetch from the in-flight map and cache it if it succeeded."""
+        if self._inflight.get(url) is task:
+            del self._inflight[url]
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        result = task.result()
+        # Failures come back as (message, None); only cache text or (content, content_type)
+        if isinstance(result, tuple) and result[1] is None:
+            return
+        with self._page_cache_lock:
+            self._page_cache[url] = (time.monotonic(), result)
+            self._page_cache.move_to_end(url)
+            while len(self._page_cache) > PAGE_CACHE_SIZE:
+                self._page_cache.popitem(last=False)
+
+    async def _fetch_page(self, session, url, timeout=60):
         """Enhanced fetch_page function with content filtering."""
         # Pre-filter URLs
         if not self.should_process_url(url):
@@ -452,13 +728,16 @@ class EnhancedWebScraper:
                 
                 # Check content length to avoid very large files
                 content_length = response.headers.get('Content-Length')
-                if content_length and int(content_length) > 5_000_000:  # 5MB limit
+                if content_length and int(content_length) > MAX_PAGE_BYTES:
                     response.release()
                     return f"Content too large: {content_length} bytes", None
                 
                 if 'text' in content_type:
-                    encoding = response.charset or 'utf-8'
-                    content = await response.text(encoding=encoding)
+                    body = await self._read_capped(response)
+                    if body is None:
+                        response.release()
+                        return f"Content too large: over {MAX_PAGE_BYTES} bytes", None
+                    content = body.decode(response.charset or 'utf-8')
                     
                     # Additional content validation
                     if self.detect_data_file_content(content):
@@ -469,7 +748,10 @@ class EnhancedWebScraper:
                     response.release()
                     return content
                 elif 'application/pdf' in content_type or 'application/msword' in content_type or 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' in content_type:
-                    content = await response.read()
+                    content = await self._read_capped(response)
+                    if content is None:
+                        response.release()
+                        return f"Content too large: over {MAX_PAGE_BYTES} bytes", None
                     # Explicitly release the connection
                     response.release()
                     return content, content_type
@@ -490,6 +772,41 @@ class EnhancedWebScraper:
             logging.error(f"Unexpected error fetching {url}: {e}")
             return f"Unexpected error: {str(e)}", None
 
+    @staticmethod
+    async def _read_capped(response):
+        """
+        Read the body in chunks, giving up as soon as it passes MAX_PAGE_BYTES.
+        Covers chunked responses that send no Content-Length; returns None when the body is too large.
+        """
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > MAX_PAGE_BYTES:
+                return None
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    async def _head_image(self, session, img_url, semaphore):
+        """Return True if the image exists and is big enough to be worth showing (over 10 KB)."""
+        async with semaphore:
+            try:
+                # Use a short timeout for HEAD requests
+                head_timeout = aiohttp.ClientTimeout(total=5, connect=2)
+                async with session.head(img_url, headers=IDENTITY_ENCODING, timeout=head_timeout) as img_response:
+                    return img_response.status == 200 and int(img_response.headers.get('Content-Length', 0)) > 10240
+            except asyncio.TimeoutError:
+                # Silently skip images that timeout - not critical
+                return False
+            except ClientError as e:
+                logging.error(f"Failed to fetch image: {img_url} - ClientError: {e}")
+                print(f"Failed to fetch image {img_url}: ClientError - {e}")
+                return False
+            except Exception as e:
+                logging.error(f"Failed to fetch image: {img_url} - Unexpected error: {e}")
+                print(f"Failed to fetch image {img_url}: Unexpected error - {e}")
+                return False
+
     async def process_page(self, session, url, semaphore, full_text=False):
         """Enhanced process_page function with better error handling and content validation."""
         async with semaphore:
@@ -498,23 +815,11 @@ class EnhancedWebScraper:
             except ClientError as e:
                 logging.error(f"Client error occurred while fetching the page: {e}")
                 print(f"Client error occurred while fetching {url}: {e}")
-                return [{
-                    "type": "text",
-                    "text": {
-                        'url': url,
-                        'error': 'Failed to fetch page due to client error'
-                    }
-                }]
+                return [page_error_entry(url, 'Failed to fetch page due to client error')]
             except Exception as e:
                 logging.error(f"Unexpected error occurred: {e}")
                 print(f"Unexpected error occurred while fetching {url}: {e}")
-                return [{
-                    "type": "text",
-                    "text": {
-                        'url': url,
-                        'error': 'An unexpected error occurred while fetching the page'
-                    }
-                }]
+                return [page_error_entry(url, 'An unexpected error occurred while fetching the page')]
             
             response_list = []
 
@@ -523,50 +828,27 @@ class EnhancedWebScraper:
                     document_content, content_type = result
                     if document_content is not None and content_type is not None:
                         try:
-                            s3_url = upload_document_to_s3(document_content, content_type, url)
-                            response_list.append({
-                                "type": "text",
-                                "text": {
-                                    'url': url,
-                                    'summary': 'This file contains additional information for your search. Send it to the user.',
-                                    's3_url': s3_url
-                                }
-                            })
+                            # Upload off the event loop so the other pages keep processing
+                            s3_url = await asyncio.to_thread(upload_document_to_s3, document_content, content_type, url)
+                            response_list.append(text_entry({
+                                'url': url,
+                                'summary': 'This file contains additional information for your search. Send it to the user.',
+                                's3_url': s3_url
+                            }))
                         except Exception as e:
                             logging.error(f"Failed to upload document to S3: {e}")
                             print(f"Failed to upload document to S3 for {url}: {e}")
-                            response_list.append({
-                                "type": "text",
-                                "text": {
-                                    'url': url,
-                                    'error': 'Failed to upload document to S3'
-                                }
-                            })
+                            response_list.append(page_error_entry(url, 'Failed to upload document to S3'))
                     else:
-                        response_list.append({
-                            "type": "text",
-                            "text": {
-                                'url': url,
-                                'error': 'Unsupported content type'
-                            }
-                        })
+                        response_list.append(page_error_entry(url, 'Unsupported content type'))
                 elif isinstance(result, str) and not result.startswith(('Timeout error', 'Client error', 'SSL handshake error', 'Unexpected error', 'URL blocked', 'Content type not allowed', 'Content too large', 'Content appears to be')):
-                    soup = BeautifulSoup(result, 'lxml')
-
-                    elements_to_extract = ['p', 'li', 'summary', 'div', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'td', 'th', 'a']
-
-                    text = ' '.join(element.get_text().strip() for element in soup.find_all(elements_to_extract))
+                    # Parse on a worker thread (lxml and lexbor parse outside the GIL) so other fetches keep moving
+                    text, author, date_published, image_sources = await asyncio.to_thread(self.extract_page_content, result)
                     cleaned_text = clean_website_data(text)
 
                     # Enhanced validation before summarization
                     if not cleaned_text or len(cleaned_text.strip()) < 100:
-                        response_list.append({
-                            "type": "text",
-                            "text": {
-                                'url': url,
-                                'error': 'Insufficient content for summarization'
-                            }
-                        })
+                        response_list.append(page_error_entry(url, 'Insufficient content for summarization'))
                         return response_list
 
                     if full_text:
@@ -587,150 +869,98 @@ class EnhancedWebScraper:
                             print(f"Failed to rank sentences for {url}: {e}")
                             summary_or_full_text = cleaned_text[:1000] + "..." if len(cleaned_text) > 1000 else cleaned_text
 
-                    author = soup.find('meta', {'name': 'author'})['content'] if soup.find('meta', {'name': 'author'}) else 'Unknown'
-                    date_published = soup.find('meta', {'property': 'article:published_time'})['content'] if soup.find('meta', {'property': 'article:published_time'}) else 'Unknown'
-
                     links = []
 
-                    response_list.append({
-                        "type": "text",
-                        "text": {
-                            'summary_or_full_text': summary_or_full_text,
-                            'author': author,
-                            'date_published': date_published,
-                            'internal_links': links
-                        }
-                    })
-
-                    images = soup.select('article img') + soup.select('figure img') + soup.select('section img')
-                    
-                    for img in images:
-                        img_url = img.get('src')
-                        if img_url:
-                            # Skip data URIs and other non-HTTP/HTTPS sources
-                            if img_url.startswith('data:'):
-                                continue
-                            if not img_url.startswith(('http://', 'https://')):
-                                img_url = urljoin(url, img_url)
-                            
-                            try:
-                                # Use a short timeout for HEAD requests
-                                head_timeout = aiohttp.ClientTimeout(total=5, connect=2)
-                                async with session.head(img_url, timeout=head_timeout) as img_response:
-                                    if img_response.status == 200 and int(img_response.headers.get('Content-Length', 0)) > 10240:
-                                        response_list.append({
-                                            "type": "image_url",
-                                            "image_url": {
-                                                'url': img_url
-                                            }
-                                        })
-                                    # Explicitly release the connection
-                                    img_response.release()
-                            except asyncio.TimeoutError:
-                                # Silently skip images that timeout - not critical
-                                pass
-                            except ClientError as e:
-                                logging.error(f"Failed to fetch image: {img_url} - ClientError: {e}")
-                                print(f"Failed to fetch image {img_url}: ClientError - {e}")
-                            except Exception as e:
-                                logging.error(f"Failed to fetch image: {img_url} - Unexpected error: {e}")
-                                print(f"Failed to fetch image {img_url}: Unexpected error - {e}")
+                    response_list.append(text_entry({
+                        'summary_or_full_text': summary_or_full_text,
+                        'author': author,
+                        'date_published': date_published,
+                        'internal_links': links
+                    }))
+
+                    # Resolve and de-duplicate image URLs in page order; pages often repeat logos and sprites
+                    img_urls = list(dict.fromkeys(
+                        img_url for img_url in (resolve_image_url(src, url) for src in image_sources) if img_url
+                    ))
+
+                    # Probe the images concurrently rather than one round trip at a time
+                    head_semaphore = asyncio.Semaphore(10)
+                    accepted = await asyncio.gather(*(self._head_image(session, img_url, head_semaphore) for img_url in img_urls))
+                    response_list.extend(image_url_entry(img_url) for img_url, is_accepted in zip(img_urls, accepted) if is_accepted)
                 else:
-                    response_list.append({
-                        "type": "text",
-                        "text": {
-                            'url': url,
-                            'error': result
-                        }
-                    })
+                    response_list.append(page_error_entry(url, result))
             except Exception as e:
                 logging.error(f"Error processing page: {e}")
                 print(f"Error processing page {url}: {e}")
-                response_list.append({
-                    "type": "text",
-                    "text": {
-                        'url': url,
-                        'error': 'An error occurred while processing the page'
-                    }
-                })
+                response_list.append(page_error_entry(url, 'An error occurred while processing the page'))
 
             return response_list
 
     async def get_web_pages(self, urls, full_text=False, max_concurrent_requests=5):
         """Enhanced get_web_pages function using the class methods."""
+        connector = None
         try:
-            # Configure connector with explicit settings to prevent resource warnings
-            connector = aiohttp.TCPConnector(
-                limit=max_concurrent_requests,
-                limit_per_host=2,
-                force_close=True,  # Force close connections to prevent warnings
-                enable_cleanup_closed=True  # Clean up closed connections immediately
-            )
-            
-            async with aiohttp.ClientSession(connector=connector) as session:
+            if asyncio.get_running_loop() is self._loop:
+                # Running on the background loop: reuse pooled connections and DNS cache
+                session = await self._get_session()
+            else:
+                # Awaited from some other loop; the pooled session is bound to ours
+                # Keep connections alive for the page fetch and its image HEADs to the same host
+                connector = aiohttp.TCPConnector(
+                    limit=max_concurrent_requests * 2,
+                    limit_per_host=8,
+                    keepalive_timeout=30,
+                    enable_cleanup_closed=True  # Clean up closed connections immediately
+                )
+                session = aiohttp.ClientSession(connector=connector, headers=SESSION_HEADERS, auto_decompress=True)
+
+            try:
                 semaphore = asyncio.Semaphore(max_concurrent_requests)
                 tasks = [self.process_page(session, url, semaphore, full_text) for url in urls]
                 # Use return_exceptions=True to prevent gather from raising exceptions
                 results = await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                if connector is not None:
+                    await session.close()
                 
-                # Process results and handle any exceptions
-                flattened_results = []
-                for i, result in enumerate(results):
-                    if isinstance(result, Exception):
-                        logging.error(f"Error processing URL {urls[i]}: {result}")
-                        flattened_results.append({
-                            "type": "text",
-                            "text": {
-                                'url': urls[i],
-                                'error': f'Failed to process page: {str(result)}'
-                            }
-                        })
-                    else:
-                        flattened_results.extend(result)
-                
-                return flattened_results
+            # Process results and handle any exceptions
+            flattened_results = []
+            for i, result in enumerate(results):
+                if isinstance(result, Exception):
+                    logging.error(f"Error processing URL {urls[i]}: {result}")
+                    flattened_results.append(page_error_entry(urls[i], f'Failed to process page: {str(result)}'))
+                else:
+                    flattened_results.extend(result)
+            
+            return flattened_results
         except Exception as e:
             logging.error(f"Error in get_web_pages: {e}")
             # Return error responses for all URLs
-            return [{
-                "type": "text",
-                "text": {
-                    'url': url,
-                    'error': f'Failed to fetch pages: {str(e)}'
-                }
-            } for url in urls]
-        finally:
-            # Ensure connector is closed even if session context manager doesn't run
-            if 'connector' in locals():
-                await connector.close()
+            return [page_error_entry(url, f'Failed to fetch pages: {str(e)}') for url in urls]
 
     def browse_internet(self, urls, full_text=False):
         """Enhanced browse_internet function - drop-in replacement."""
         try:
-            # Suppress resource warnings in Lambda environment
-            import warnings
-            warnings.filterwarnings("ignore", category=ResourceWarning)
-            
-            web_pages = asyncio.run(self.get_web_pages(urls, full_text))
+            web_pages = self.run(self.get_web_pages(urls, full_text))
             return web_pages
         except asyncio.TimeoutError:
             logging.error(f"Timeout error in browse_internet for URLs: {urls}")
-            return [{
-                "type": "text",
-                "text": {
-                    'error': 'Request timed out while fetching web pages',
-                    'urls': urls
-                }
-            }]
+            return [text_entry({'error': 'Request timed out while fetching web pages', 'urls': urls})]
         except Exception as e:
             logging.error(f"Error in browse_internet: {e}")
-            return [{
-                "type": "text",
-                "text": {
-                    'error': f'Failed to fetch web pages: {str(e)}',
-                    'urls': urls
-                }
-            }]
+            return [text_entry({'error': f'Failed to fetch web pages: {str(e)}', 'urls': urls})]
+
+
+def upload_document_to_s3(document_content, content_type, document_url):
+    document_extension = guess_file_extension(content_type)
+    s3_object_name = f"Document_{s3_object_timestamp()}{document_extension}"
+
+    # Upload to S3; large documents go multipart
+    s3_client.upload_fileobj(BytesIO(document_content), docs_bucket_name, s3_object_name, Config=s3_transfer_config)
+
+    # Construct the S3 URL  
+    s3_url = f"https://{docs_bucket_name}.s3.amazonaws.com/{s3_object_name}"
+    return s3_url
 
 
 def upload_image_content_to_s3(image_content: bytes, mime_type: str) -> str:
@@ -745,11 +975,10 @@ def upload_image_content_to_s3(image_content: bytes, mime_type: str) -> str:
     Returns:
         str: S3 URL of uploaded image
     """
-    image_extension = mimetypes.guess_extension(mime_type) or '.bin'
-    s3_object_name = f"Generated_Image_{datetime.datetime.now(datetime.UTC).strftime('%Y%m%d%H%M%S')}{image_extension}"
+    image_extension = guess_file_extension(mime_type)
+    s3_object_name = f"Generated_Image_{s3_object_timestamp()}{image_extension}"
     
     # Upload to S3
-    s3_client = boto3.client('s3')
     s3_client.put_object(Body=image_content, Bucket=image_bucket_name, Key=s3_object_name)
     
     # Construct the S3 URL
@@ -875,7 +1104,7 @@ def gemini_generate_content(
         }
         
         # Make the request
-        response = requests.post(
+        response = http_session.post(
             url,
             headers=headers,
             json=payload,
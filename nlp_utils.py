@@ -1,42 +1,52 @@
 import boto3
+import heapq
 import json
+import os
 import re
 
-from nltk.tokenize import sent_tokenize, word_tokenize
+from collections import Counter
+from functools import lru_cache
 
 client = boto3.client('lambda')
 
+@lru_cache(maxsize=None)
 def load_stopwords(file_path):
     """
     Load stopwords from a given file.
 
     :param file_path: Path to the stopwords file.
-    :return: Set of stopwords.
+    :return: Frozen set of stopwords.
     """
     with open(file_path, 'r') as file:
-        stopwords = set(file.read().splitlines())
+        stopwords = frozenset(file.read().splitlines())
     return stopwords
 
 
+# The English list ships next to this module as a plain word-per-line file; read it once per container
+STOPWORDS_EN = load_stopwords(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'english'))
+
+
 def rank_sentences(text, stopwords, max_sentences=10):
     """
     Rank sentences in the text based on word frequency, returning top 'max_sentences' sentences.   
     """
-    word_frequencies = {}
-    for word in word_tokenize(text.lower()):
-        if word.isalpha() and word not in stopwords:  # Consider only alphabetic words
-            word_frequencies[word] = word_frequencies.get(word, 0) + 1
+    from nltk.tokenize import sent_tokenize, word_tokenize
 
-    sentence_scores = {}
+    # Tokenize each sentence once; the same words feed both the frequency count and the scores
     sentences = sent_tokenize(text)
-    for sent in sentences:
-        for word in word_tokenize(sent.lower()):
-            if word in word_frequencies and len(sent.split(' ')) < 30:
-                sentence_scores[sent] = sentence_scores.get(sent, 0) + word_frequencies[word]
-
-    sorted_sentences = sorted(sentence_scores, key=sentence_scores.get, reverse=True)
-    #print(f'Sentences:{sorted_sentences}')
-    summary_sentences = sorted_sentences[:max_sentences]
+    sentence_words = [
+        [word for word in word_tokenize(sent.lower()) if word.isalpha() and word not in stopwords]  # Consider only alphabetic words
+        for sent in sentences
+    ]
+    word_frequencies = Counter(word for words in sentence_words for word in words)
+
+    sentence_scores = {}
+    for sent, words in zip(sentences, sentence_words):
+        if words and len(sent.split(' ')) < 30:
+            sentence_scores[sent] = sentence_scores.get(sent, 0) + sum(word_frequencies[word] for word in words)
+
+    # nlargest keeps sorted()'s tie order without sorting every sentence
+    summary_sentences = heapq.nlargest(max_sentences, sentence_scores, key=sentence_scores.get)
     #print(f'Summary Sentences:{summary_sentences}')
     
     # Add a full stop at the end of each sentence if it doesn't already end with one 
@@ -65,13 +75,11 @@ def summarize_messages(data):
     """
     Summarize messages from a dictionary and return a dictionary with the summarized conversation. 
     """
-    stopwords = load_stopwords('english')
-    
     # Create play-like records
     records = [f"{item['sort_key']}: {item['chat_id']}: {item['role']}: {item['message']}" for item in data]
     
     # Summarize each record
-    summarized_records = [summarize_record(record, stopwords) for record in records]
+    summarized_records = [summarize_record(record, STOPWORDS_EN) for record in records]
     
     return summarized_records
 
@@ -10,12 +10,13 @@ from storage import transform_objects
 from storage_pooled import (
     get_last_messages_weaviate_pooled,
     get_relevant_messages_pooled,
-    init_weaviate_pool
+    init_weaviate_pool,
+    warm_weaviate_pool
 )
 from config import user_table, assistant_table
 
-# Initialize the connection pool
-init_weaviate_pool(pool_size=5, max_overflow=2)
+# Start building the connection pool while the rest of the modules import
+warm_weaviate_pool(pool_size=5, max_overflow=2)
 
 # Use pooled versions for better performance
 get_last_messages_weaviate = get_last_messages_weaviate_pooled
@@ -23,17 +24,16 @@ get_relevant_messages = get_relevant_messages_pooled
 
 
 @time_operation("parallel_message_history")
-def get_message_history_parallel(chat_id: str, num_messages: int, full_text_len: int) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
+def fetch_recent_messages_parallel(chat_id: str, num_messages: int) -> Tuple[List[Dict], List[Dict]]:
     """
-    Retrieve user and assistant message history in parallel.
+    Fetch the latest user and assistant messages in parallel, newest first.
     
     Args:
         chat_id: The chat identifier
-        num_messages: Total number of messages to retrieve
-        full_text_len: Number of recent messages to keep separate
+        num_messages: Number of messages to fetch from each collection
         
     Returns:
-        Tuple of (msg_history, all_messages, user_messages, assistant_messages)
+        Tuple of (user_messages, assistant_messages)
     """
     executor = ParallelExecutor(max_workers=2)
     
@@ -46,9 +46,26 @@ def get_message_history_parallel(chat_id: str, num_messages: int, full_text_len:
     # Execute tasks in parallel
     results = executor.execute_parallel_tasks(tasks)
     
-    # Process results
-    user_messages_full = results.get(0, [])
-    assistant_messages_full = results.get(1, [])
+    return results.get(0, []), results.get(1, [])
+
+
+def split_message_history(user_messages_full: List[Dict], assistant_messages_full: List[Dict],
+                          num_messages: int, full_text_len: int) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
+    """
+    Split fetched messages into older history and the most recent full-text messages.
+    
+    Args:
+        user_messages_full: User messages, newest first
+        assistant_messages_full: Assistant messages, newest first
+        num_messages: Total number of messages to keep from each collection
+        full_text_len: Number of recent messages to keep separate
+        
+    Returns:
+        Tuple of (msg_history, all_messages, user_messages, assistant_messages)
+    """
+    # Messages are newest first, so a larger fetch can be trimmed to the same result
+    user_messages_full = user_messages_full[:num_messages]
+    assistant_messages_full = assistant_messages_full[:num_messages]
     
     # Split into history and recent messages
     user_msg_history = user_messages_full[full_text_len:]
@@ -68,6 +85,22 @@ def get_message_history_parallel(chat_id: str, num_messages: int, full_text_len:
     return msg_history, all_messages, user_messages, assistant_messages
 
 
+def get_message_history_parallel(chat_id: str, num_messages: int, full_text_len: int) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
+    """
+    Retrieve user and assistant message history in parallel.
+    
+    Args:
+        chat_id: The chat identifier
+        num_messages: Total number of messages to retrieve
+        full_text_len: Number of recent messages to keep separate
+        
+    Returns:
+        Tuple of (msg_history, all_messages, user_messages, assistant_messages)
+    """
+    user_messages_full, assistant_messages_full = fetch_recent_messages_parallel(chat_id, num_messages)
+    return split_message_history(user_messages_full, assistant_messages_full, num_messages, full_text_len)
+
+
 @time_operation("parallel_relevance_search")
 def get_relevant_messages_parallel(chat_id: str, text: str, relevant_count: int) -> List[Dict]:
     """
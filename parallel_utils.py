@@ -5,7 +5,9 @@ This module provides timing decorators and parallel execution capabilities.
 
 import time
 import json
+import threading
 import boto3
+import concurrent.futures
 from functools import wraps
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
@@ -120,9 +122,16 @@ def log_performance_data(operation: str, duration: float, metadata: Optional[Dic
     print(json.dumps(log_entry))
 
 
+# Every ParallelExecutor submits to this one pool, so warm invocations reuse its threads
+# instead of creating and tearing down a pool per call. Threads start on demand and the
+# size leaves room for the nested fan-out in parallel_preprocessing.
+SHARED_POOL_SIZE = 16
+_shared_pool = ThreadPoolExecutor(max_workers=SHARED_POOL_SIZE, thread_name_prefix="parallel")
+
+
 class ParallelExecutor:
     """
-    Manages parallel execution of multiple tasks using ThreadPoolExecutor.
+    Manages parallel execution of multiple tasks on the shared thread pool.
     """
     
     def __init__(self, max_workers: int = 5):
@@ -130,9 +139,21 @@ class ParallelExecutor:
         Initialize the ParallelExecutor.
         
         Args:
-            max_workers: Maximum number of worker threads
+            max_workers: Maximum number of this executor's tasks running at once
         """
         self.max_workers = max_workers
+
+    def _submit_all(self, tasks: List[Tuple[Callable, Tuple, Dict]]) -> Dict[Any, int]:
+        """Submit tasks to the shared pool, at most max_workers in flight; returns future -> index."""
+        slots = threading.BoundedSemaphore(self.max_workers)
+        futures = {}
+        for idx, (func, args, kwargs) in enumerate(tasks):
+            # Wait on the caller's thread, never inside a pool thread
+            slots.acquire()
+            future = _shared_pool.submit(func, *args, **kwargs)
+            future.add_done_callback(lambda _: slots.release())
+            futures[future] = idx
+        return futures
     
     def execute_parallel_tasks(self, tasks: List[Tuple[Callable, Tuple, Dict]]) -> Dict[int, Any]:
         """
@@ -146,27 +167,23 @@ class ParallelExecutor:
         """
         results = {}
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            future_to_index = {
-                executor.submit(func, *args, **kwargs): idx 
-                for idx, (func, args, kwargs) in enumerate(tasks)
-            }
-            
-            # Collect results as they complete
-            for future in as_completed(future_to_index):
-                idx = future_to_index[future]
-                try:
-                    results[idx] = future.result()
-                except Exception as e:
-                    print(f"Task {idx} failed: {e}")
-                    results[idx] = None
-                    # Log the error for monitoring
-                    log_performance_data(
-                        f"parallel_task_error",
-                        0,
-                        {"task_index": idx, "error": str(e)}
-                    )
+        # Submit all tasks
+        future_to_index = self._submit_all(tasks)
+        
+        # Collect results as they complete
+        for future in as_completed(future_to_index):
+            idx = future_to_index[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                print(f"Task {idx} failed: {e}")
+                results[idx] = None
+                # Log the error for monitoring
+                log_performance_data(
+                    f"parallel_task_error",
+                    0,
+                    {"task_index": idx, "error": str(e)}
+                )
         
         return results
     
@@ -184,36 +201,32 @@ class ParallelExecutor:
         """
         results = {}
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            futures = {}
-            for idx, (func, args, kwargs) in enumerate(tasks):
-                future = executor.submit(func, *args, **kwargs)
-                futures[future] = idx
-            
-            # Wait for completion with timeout
-            completed, pending = concurrent.futures.wait(
-                futures.keys(), 
-                timeout=timeout,
-                return_when=concurrent.futures.ALL_COMPLETED
-            )
-            
-            # Process completed tasks
-            for future in completed:
-                idx = futures[future]
-                try:
-                    results[idx] = future.result()
-                except Exception as e:
-                    print(f"Task {idx} failed: {e}")
-                    results[idx] = None
-            
-            # Cancel pending tasks
-            for future in pending:
-                idx = futures[future]
-                future.cancel()
-                print(f"Task {idx} timed out after {timeout}s")
+        # Submit all tasks
+        futures = self._submit_all(tasks)
+        
+        # Wait for completion with timeout
+        completed, pending = concurrent.futures.wait(
+            futures.keys(), 
+            timeout=timeout,
+            return_when=concurrent.futures.ALL_COMPLETED
+        )
+        
+        # Process completed tasks
+        for future in completed:
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                print(f"Task {idx} failed: {e}")
                 results[idx] = None
         
+        # Cancel pending tasks
+        for future in pending:
+            idx = futures[future]
+            future.cancel()
+            print(f"Task {idx} timed out after {timeout}s")
+            results[idx] = None
+        
         return results
 
 
@@ -0,0 +1,744 @@
+"""
+ReportLab PDF rendering for send_as_pdf.
+Kept out of lambda_function so ReportLab is only imported when a PDF is actually built.
+"""
+
+import aiohttp
+import asyncio
+import base64
+import logging
+import re
+
+from functools import lru_cache
+from html import unescape
+from html.parser import HTMLParser
+from io import BytesIO
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY, TA_RIGHT
+from reportlab.lib import colors
+from reportlab.graphics.shapes import Drawing, Line
+from urllib.request import urlopen
+from xml.sax.saxutils import escape
+
+try:
+    from markdown_it import MarkdownIt
+except ImportError:
+    MarkdownIt = None
+
+logger = logging.getLogger(__name__)
+
+
+# Images larger than this are skipped rather than loaded into memory
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+IMAGE_FETCH_CONCURRENCY = 10
+HTML_IMG_SRC_RE = re.compile(r'<img[^>]+src="([^"]+)"', re.IGNORECASE)
+
+METADATA_KEYWORDS = ('prepared by:', 'date:', 'author:', 'version:')
+# Tags BeautifulHTMLParser keeps open-counts for when choosing styles
+TRACKED_TAGS = ('strong', 'b', 'em', 'i', 'h1', 'h2', 'h3', 'li', 'blockquote')
+
+
+def read_limited(stream, limit=MAX_IMAGE_BYTES):
+    """Read a file-like object, raising ValueError once it exceeds limit bytes."""
+    data = stream.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError(f"image larger than {limit // (1024 * 1024)} MB")
+    return data
+
+
+async def _fetch_image(session, url, semaphore):
+    """Download one image, returning None on errors or when it exceeds MAX_IMAGE_BYTES."""
+    async with semaphore:
+        try:
+            async with session.get(url) as response:
+                if response.status != 200 or (response.content_length or 0) > MAX_IMAGE_BYTES:
+                    return None
+                # read(n) returns whatever is buffered, so collect chunks until EOF
+                chunks = []
+                size = 0
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        return None
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Image prefetch failed for %s: %s", url, e)
+            return None
+
+
+async def prefetch_images(session, urls):
+    """Fetch image URLs concurrently; returns {url: bytes or None if it failed}."""
+    semaphore = asyncio.Semaphore(IMAGE_FETCH_CONCURRENCY)
+    results = await asyncio.gather(*(_fetch_image(session, url, semaphore) for url in urls))
+    return dict(zip(urls, results))
+
+
+THEMES = {
+    'professional': {
+        'primary_color': colors.HexColor('#2C3E50'),
+        'accent_color': colors.HexColor('#3498DB'),
+        'text_color': colors.HexColor('#2C3E50'),
+        'light_gray': colors.HexColor('#ECF0F1'),
+        'dark_gray': colors.HexColor('#7F8C8D')
+    },
+    'modern': {
+        'primary_color': colors.HexColor('#1A1A1A'),
+        'accent_color': colors.HexColor('#FF6B6B'),
+        'text_color': colors.HexColor('#333333'),
+        'light_gray': colors.HexColor('#F8F9FA'),
+        'dark_gray': colors.HexColor('#6C757D')
+    },
+    'corporate': {
+        'primary_color': colors.HexColor('#0F4C75'),
+        'accent_color': colors.HexColor('#3282B8'),
+        'text_color': colors.HexColor('#2C3E50'),
+        'light_gray': colors.HexColor('#E8F4FD'),
+        'dark_gray': colors.HexColor('#5A6C7D')
+    }
+}
+
+
+@lru_cache(maxsize=8)
+def _build_stylesheet(theme):
+    """Build the sample stylesheet plus the themed paragraph styles for a theme.
+
+    Cached per theme; callers get a copy from _copy_stylesheet so documents
+    never share a mutable StyleSheet1.
+    """
+    styles = getSampleStyleSheet()
+    theme_colors = THEMES.get(theme, THEMES['professional'])
+    
+    # Title page style
+    styles.add(ParagraphStyle(
+        name='DocumentTitle',
+        parent=styles['Title'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=theme_colors['primary_color'],
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Section headers with colored background
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceBefore=25,
+        spaceAfter=15,
+        textColor=colors.white,
+        fontName='Helvetica-Bold',
+        backColor=theme_colors['primary_color'],
+        borderPadding=10,
+        leftIndent=10,
+        rightIndent=10
+    ))
+    
+    # Subsection headers
+    styles.add(ParagraphStyle(
+        name='SubsectionHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceBefore=20,
+        spaceAfter=12,
+        textColor=theme_colors['accent_color'],
+        fontName='Helvetica-Bold',
+        borderWidth=0,
+        borderColor=theme_colors['accent_color'],
+        borderPadding=5,
+        leftIndent=5
+    ))
+    
+    # Minor headers
+    styles.add(ParagraphStyle(
+        name='MinorHeader',
+        parent=styles['Heading3'],
+        fontSize=13,
+        spaceBefore=15,
+        spaceAfter=10,
+        textColor=theme_colors['primary_color'],
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Body text with tighter spacing
+    styles.add(ParagraphStyle(
+        name='BeautifulBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceBefore=4,
+        spaceAfter=4,
+        alignment=TA_JUSTIFY,
+        leading=14,
+        textColor=theme_colors['text_color'],
+        fontName='Helvetica'
+    ))
+    
+    # SCQA section headers renamed to SectionHeader for any bold text ending with colon
+    styles.add(ParagraphStyle(
+        name='SCQAHeader',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceBefore=12,
+        spaceAfter=6,
+        alignment=TA_LEFT,
+        leading=14,
+        textColor=theme_colors['primary_color'],
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Enhanced list style with tighter spacing
+    styles.add(ParagraphStyle(
+        name='BeautifulBullet',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceBefore=2,
+        spaceAfter=2,
+        leftIndent=25,
+        bulletIndent=15,
+        leading=14,
+        textColor=theme_colors['text_color'],
+        fontName='Helvetica'
+    ))
+    
+    # Quote/callout style with tighter spacing
+    styles.add(ParagraphStyle(
+        name='Callout',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceBefore=8,
+        spaceAfter=8,
+        leftIndent=20,
+        rightIndent=20,
+        alignment=TA_JUSTIFY,
+        leading=14,
+        textColor=theme_colors['text_color'],
+        backColor=theme_colors['light_gray'],
+        borderColor=theme_colors['accent_color'],
+        borderWidth=1,
+        borderPadding=10,
+        fontName='Helvetica-Oblique'
+    ))
+    
+    # Metadata/footer style
+    styles.add(ParagraphStyle(
+        name='Metadata',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceBefore=15,
+        spaceAfter=3,
+        alignment=TA_RIGHT,
+        textColor=theme_colors['dark_gray'],
+        fontName='Helvetica-Oblique'
+    ))
+
+    return styles
+
+
+def _copy_stylesheet(styles):
+    """Return a StyleSheet1 sharing the cached styles but with its own name tables."""
+    copied = StyleSheet1()
+    copied.byName = dict(styles.byName)
+    copied.byAlias = dict(styles.byAlias)
+    return copied
+
+
+class BeautifulPDFGenerator:
+    def __init__(self, title, page_size=letter, theme='professional'):
+        self.title = title
+        self.page_size = page_size
+        self.theme = theme
+        self.styles = _copy_stylesheet(_build_stylesheet(theme))
+        self.story = []
+        self.themes = THEMES
+        self.image_cache = {}
+
+    def prefetch_remote_images(self, urls):
+        """Download the document's remote images concurrently before the story is built"""
+        remote_urls = list(dict.fromkeys(
+            url for url in urls
+            if url.startswith(('http://', 'https://')) and url not in self.image_cache
+        ))
+        if not remote_urls:
+            return
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # Already inside an event loop; add_image falls back to fetching each URL itself
+            logger.info("Image prefetch skipped: an event loop is already running")
+            return
+
+        async def fetch_all():
+            timeout = aiohttp.ClientTimeout(total=30)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                return await prefetch_images(session, remote_urls)
+
+        self.image_cache.update(asyncio.run(fetch_all()))
+
+    def _create_header_footer_canvas(self, canvas_obj, doc):
+        """Beautiful header and footer with styling"""
+        canvas_obj.saveState()
+        theme_colors = self.themes.get(self.theme, self.themes['professional'])
+        
+        # Header with colored line
+        canvas_obj.setStrokeColor(theme_colors['accent_color'])
+        canvas_obj.setLineWidth(2)
+        header_y = doc.height + doc.topMargin - 0.3 * inch
+        canvas_obj.line(doc.leftMargin, header_y, doc.width + doc.leftMargin, header_y)
+        
+        # Header text
+        canvas_obj.setFont('Helvetica-Bold', 11)
+        canvas_obj.setFillColor(theme_colors['primary_color'])
+        x_center = doc.width / 2 + doc.leftMargin
+        
+        if hasattr(canvas_obj, 'drawCentredText'):
+            canvas_obj.drawCentredText(x_center, header_y + 15, self.title)
+        else:
+            text_width = canvas_obj.stringWidth(self.title, 'Helvetica-Bold', 11)
+            canvas_obj.drawString(x_center - text_width/2, header_y + 15, self.title)
+        
+        # Footer with styled page numbers
+        canvas_obj.setStrokeColor(theme_colors['accent_color'])
+        canvas_obj.setLineWidth(1)
+        footer_y = doc.bottomMargin - 0.5 * inch
+        canvas_obj.line(doc.leftMargin, footer_y + 15, doc.width + doc.leftMargin, footer_y + 15)
+        
+        canvas_obj.setFont('Helvetica', 9)
+        canvas_obj.setFillColor(theme_colors['dark_gray'])
+        footer_text = f'Page {canvas_obj.getPageNumber()}'
+        
+        if hasattr(canvas_obj, 'drawCentredText'):
+            canvas_obj.drawCentredText(x_center, footer_y, footer_text)
+        else:
+            text_width = canvas_obj.stringWidth(footer_text, 'Helvetica', 9)
+            canvas_obj.drawString(x_center - text_width/2, footer_y, footer_text)
+        
+        canvas_obj.restoreState()
+
+    def add_title_page(self):
+        """Add a beautiful title page"""
+        theme_colors = self.themes.get(self.theme, self.themes['professional'])
+        
+        # Add some space
+        self.story.append(Spacer(1, 2*inch))
+        
+        # Main title
+        title_para = Paragraph(self.title, self.styles['DocumentTitle'])
+        self.story.append(title_para)
+        
+        # Decorative line
+        line_drawing = Drawing(400, 20)
+        line_drawing.add(Line(0, 10, 400, 10, strokeColor=theme_colors['accent_color'], strokeWidth=3))
+        self.story.append(line_drawing)
+        
+        self.story.append(Spacer(1, 1*inch))
+        
+    def add_image(self, image_source, width=None, height=None, caption=None):
+        """Add an image (URL, data URI, file path, bytes or BytesIO) with optional caption"""
+        try:
+            # Handle already-downloaded image data
+            if isinstance(image_source, (bytes, bytearray)):
+                img = Image(BytesIO(image_source))
+            elif isinstance(image_source, BytesIO):
+                img = Image(image_source)
+            # Handle URLs, preferring bytes fetched by prefetch_remote_images
+            elif image_source.startswith(('http://', 'https://')):
+                if image_source in self.image_cache:
+                    image_bytes = self.image_cache[image_source]
+                    if image_bytes is None:
+                        raise ValueError("download failed or image too large")
+                else:
+                    with urlopen(image_source, timeout=15) as response:
+                        image_bytes = read_limited(response)
+                img = Image(BytesIO(image_bytes))
+            # Handle base64 encoded images
+            elif image_source.startswith('data:image'):
+                header, data = image_source.split(',', 1)
+                image_data = BytesIO(base64.b64decode(data))
+                img = Image(image_data)
+            # Handle local file paths
+            else:
+                img = Image(image_source)
+            
+            # Set dimensions
+            if width and height:
+                img.drawWidth = width
+                img.drawHeight = height
+            elif width:
+                img.drawWidth = width
+                img.drawHeight = img.drawHeight * (width / img.drawWidth)
+            elif height:
+                img.drawHeight = height
+                img.drawWidth = img.drawWidth * (height / img.drawHeight)
+            else:
+                # Default max width
+                max_width = 5*inch
+                if img.drawWidth > max_width:
+                    img.drawHeight = img.drawHeight * (max_width / img.drawWidth)
+                    img.drawWidth = max_width
+            
+            # Center the image
+            img.hAlign = 'CENTER'
+            
+            self.story.append(Spacer(1, 10))
+            self.story.append(img)
+            
+            # Add caption if provided
+            if caption:
+                caption_style = ParagraphStyle(
+                    'ImageCaption',
+                    parent=self.styles['Normal'],
+                    fontSize=9,
+                    spaceAfter=15,
+                    alignment=TA_CENTER,
+                    textColor=self.themes[self.theme]['dark_gray'],
+                    fontName='Helvetica-Oblique'
+                )
+                self.story.append(Paragraph(f"<i>{caption}</i>", caption_style))
+            else:
+                self.story.append(Spacer(1, 10))
+                
+        except Exception as e:
+            # If image fails to load, add an error message
+            error_para = Paragraph(f"[Image could not be loaded: {str(e)}]", self.styles['BeautifulBody'])
+            self.story.append(error_para)
+
+    def write_markdown(self, markdown_text):
+        """Convert Markdown straight to story elements from the markdown-it token stream"""
+        BeautifulMarkdownRenderer(self.styles, self).render(markdown_text)
+
+    def write_html(self, html_content):
+        """Convert HTML content to beautiful ReportLab story elements"""
+        self.prefetch_remote_images([unescape(src) for src in HTML_IMG_SRC_RE.findall(html_content)])
+        parser = BeautifulHTMLParser(self.styles, self)
+        parser.feed(html_content)
+        self.story.extend(parser.get_story())
+
+    def generate_pdf(self, output):
+        """Generate the beautiful PDF into a file path or a file-like object such as BytesIO"""
+        doc = SimpleDocTemplate(
+            output,
+            pagesize=self.page_size,
+            rightMargin=0.8*inch,
+            leftMargin=0.8*inch,
+            topMargin=1.2*inch,
+            bottomMargin=1*inch
+        )
+        
+        # Build the PDF with custom canvas for headers/footers
+        doc.build(
+            self.story, 
+            onFirstPage=self._create_header_footer_canvas,
+            onLaterPages=self._create_header_footer_canvas
+        )
+
+
+class BeautifulHTMLParser(HTMLParser):
+    """Enhanced HTML parser with image support and beautiful formatting"""
+    
+    def __init__(self, styles, pdf_generator):
+        super().__init__()
+        self.styles = styles
+        self.pdf_generator = pdf_generator
+        self.story = []
+        self._buf = []
+        self.tag_stack = []
+        # Open-tag counts so style checks don't rescan tag_stack for every text node
+        self._depth = dict.fromkeys(TRACKED_TAGS, 0)
+        self.list_level = 0
+        self.in_strong_section = False
+        
+    def handle_starttag(self, tag, attrs):
+        self.tag_stack.append((tag, dict(attrs)))
+        if tag in self._depth:
+            self._depth[tag] += 1
+        
+        # Handle images
+        if tag == 'img':
+            self._flush_current_text()
+            attrs_dict = dict(attrs)
+            src = attrs_dict.get('src', '')
+            alt = attrs_dict.get('alt', '')
+            width = attrs_dict.get('width')
+            height = attrs_dict.get('height')
+            
+            if width:
+                width = float(width.replace('px', '')) if 'px' in str(width) else float(width)
+            if height:
+                height = float(height.replace('px', '')) if 'px' in str(height) else float(height)
+                
+            self.pdf_generator.add_image(src, width, height, alt if alt else None)
+            return
+        
+        # Don't flush text for inline formatting tags
+        if tag in ['h1', 'h2', 'h3', 'p', 'ul', 'ol', 'blockquote', 'hr']:
+            self._flush_current_text()
+            
+        if tag == 'hr':
+            # Add a horizontal rule
+            theme_colors = self.pdf_generator.themes.get(self.pdf_generator.theme, self.pdf_generator.themes['professional'])
+            line_drawing = Drawing(400, 10)
+            line_drawing.add(Line(0, 5, 400, 5, strokeColor=theme_colors['accent_color'], strokeWidth=1))
+            self.story.append(line_drawing)
+            self.story.append(Spacer(1, 10))
+            
+        if tag in ['ul', 'ol']:
+            self.list_level += 1
+            
+    def handle_endtag(self, tag):
+        if self.tag_stack and self.tag_stack[-1][0] == tag:
+            self.tag_stack.pop()
+            if tag in self._depth:
+                self._depth[tag] -= 1
+            
+        if tag in ['h1', 'h2', 'h3', 'p', 'li', 'blockquote']:
+            self._flush_current_text(tag)
+            
+        if tag in ['ul', 'ol']:
+            self.list_level = max(0, self.list_level - 1)
+            
+        if tag in ['strong', 'b']:
+            self.in_strong_section = False
+            
+    def handle_data(self, data):
+        self._buf.append(data)
+        
+    def _flush_current_text(self, end_tag=None):
+        """Convert accumulated text to appropriate beautiful paragraph style"""
+        text = ''.join(self._buf).strip()
+        self._buf.clear()
+        if not text:
+            return
+        depth = self._depth
+        
+        # Check for section headers (any bold text ending with colon) BEFORE applying formatting
+        is_section_header = bool(depth['strong'] or depth['b']) and text.endswith(':')
+        
+        formatted_text = self._apply_beautiful_formatting(text)
+        
+        # Determine style based on current context
+        if depth['h1'] or end_tag == 'h1':
+            style = self.styles['SectionHeader']
+        elif depth['h2'] or end_tag == 'h2':
+            style = self.styles['SubsectionHeader']
+        elif depth['h3'] or end_tag == 'h3':
+            style = self.styles['MinorHeader']
+        elif is_section_header:
+            style = self.styles['SCQAHeader']
+        elif depth['blockquote'] or end_tag == 'blockquote':
+            style = self.styles['Callout']
+        elif depth['li'] or end_tag == 'li':
+            style = self.styles['BeautifulBullet']
+            formatted_text = f"• {formatted_text}"
+        else:
+            # Check if this looks like metadata (prepared by, date, etc.)
+            if any(keyword in text.lower() for keyword in METADATA_KEYWORDS):
+                style = self.styles['Metadata']
+            else:
+                style = self.styles['BeautifulBody']
+            
+        if formatted_text:
+            para = Paragraph(formatted_text, style)
+            
+            # Add some special handling for section breaks
+            if '---' in text:
+                theme_colors = self.pdf_generator.themes.get(self.pdf_generator.theme, self.pdf_generator.themes['professional'])
+                line_drawing = Drawing(400, 20)
+                line_drawing.add(Line(50, 10, 350, 10, strokeColor=theme_colors['accent_color'], strokeWidth=2))
+                self.story.append(Spacer(1, 8))
+                self.story.append(line_drawing)
+                self.story.append(Spacer(1, 8))
+            else:
+                self.story.append(para)
+        
+    def _apply_beautiful_formatting(self, text):
+        """Apply beautiful inline formatting"""
+        formatted_text = text
+        
+        # Apply formatting based on which inline tags are open
+        if self._depth['em'] or self._depth['i']:
+            formatted_text = f"<i>{formatted_text}</i>"
+        if self._depth['strong'] or self._depth['b']:
+            formatted_text = f"<b>{formatted_text}</b>"
+                
+        return formatted_text
+        
+    def get_story(self):
+        self._flush_current_text()
+        return self.story
+
+
+@lru_cache(maxsize=1)
+def _markdown_parser():
+    """Shared markdown-it parser; parse() keeps no state between calls."""
+    return MarkdownIt("commonmark", {"html": False}).enable(["strikethrough", "table"])
+
+
+INLINE_MARKUP = {
+    'strong_open': '<b>', 'strong_close': '</b>',
+    'em_open': '<i>', 'em_close': '</i>',
+    's_open': '<strike>', 's_close': '</strike>',
+    'link_close': '</link>',
+    'softbreak': ' ', 'hardbreak': '<br/>',
+}
+
+
+class BeautifulMarkdownRenderer:
+    """Render markdown-it tokens straight to ReportLab flowables, skipping the HTML round-trip"""
+
+    def __init__(self, styles, pdf_generator):
+        self.styles = styles
+        self.pdf_generator = pdf_generator
+        # Write into the generator's story so images from add_image stay in document order
+        self.story = pdf_generator.story
+        self.heading_level = 0
+        self.blockquote_depth = 0
+        self.list_item_depth = 0
+        self.in_table_head = False
+        self.table_rows = None
+
+    def render(self, markdown_text):
+        tokens = _markdown_parser().parse(markdown_text)
+        self.pdf_generator.prefetch_remote_images([
+            child.attrGet('src') or ''
+            for token in tokens if token.type == 'inline'
+            for child in token.children or () if child.type == 'image'
+        ])
+
+        for token in tokens:
+            token_type = token.type
+
+            if token_type == 'inline':
+                self._render_inline(token)
+            elif token_type == 'heading_open':
+                self.heading_level = int(token.tag[1])
+            elif token_type == 'heading_close':
+                self.heading_level = 0
+            elif token_type == 'blockquote_open':
+                self.blockquote_depth += 1
+            elif token_type == 'blockquote_close':
+                self.blockquote_depth -= 1
+            elif token_type == 'list_item_open':
+                self.list_item_depth += 1
+            elif token_type == 'list_item_close':
+                self.list_item_depth -= 1
+            elif token_type in ('fence', 'code_block'):
+                self._add_code_block(token.content)
+            elif token_type == 'hr':
+                self._add_rule()
+            elif token_type == 'table_open':
+                self.table_rows = []
+            elif token_type == 'thead_open':
+                self.in_table_head = True
+            elif token_type == 'thead_close':
+                self.in_table_head = False
+            elif token_type == 'tr_open':
+                self.table_rows.append([])
+            elif token_type == 'table_close':
+                self._add_table(self.table_rows)
+                self.table_rows = None
+
+    def _render_inline(self, token):
+        """Build paragraph markup for one inline token and add it with any images it holds"""
+        parts = []
+        plain_parts = []
+        images = []
+        children = token.children or ()
+
+        for child in children:
+            child_type = child.type
+            if child_type == 'text':
+                parts.append(escape(child.content))
+                plain_parts.append(child.content)
+            elif child_type in INLINE_MARKUP:
+                parts.append(INLINE_MARKUP[child_type])
+            elif child_type == 'code_inline':
+                parts.append(f'<font face="Courier">{escape(child.content)}</font>')
+                plain_parts.append(child.content)
+            elif child_type == 'link_open':
+                href = escape(child.attrGet('href') or '', {'"': '&quot;'})
+                parts.append(f'<link href="{href}">')
+            elif child_type == 'image':
+                images.append((child.attrGet('src') or '', child.content or None))
+
+        formatted_text = ''.join(parts).strip()
+        text = ''.join(plain_parts).strip()
+
+        if self.table_rows is not None:
+            if self.in_table_head:
+                formatted_text = f"<b>{formatted_text}</b>"
+            self.table_rows[-1].append(Paragraph(formatted_text, self.styles['BeautifulBody']))
+            return
+
+        if formatted_text:
+            # Bold text ending with a colon is a section header, as in the HTML path
+            significant = [child.type for child in children if child.type != 'text' or child.content.strip()]
+            is_section_header = (
+                text.endswith(':')
+                and significant[0] == 'strong_open'
+                and significant[-1] == 'strong_close'
+            )
+            style = self._select_style(text, is_section_header)
+            if style is self.styles['BeautifulBullet']:
+                formatted_text = f"• {formatted_text}"
+            self.story.append(Paragraph(formatted_text, style))
+
+        for src, caption in images:
+            self.pdf_generator.add_image(src, caption=caption)
+
+    def _select_style(self, text, is_section_header):
+        """Pick the paragraph style for the current block context"""
+        if self.heading_level == 1:
+            return self.styles['SectionHeader']
+        if self.heading_level == 2:
+            return self.styles['SubsectionHeader']
+        if self.heading_level:
+            return self.styles['MinorHeader']
+        if is_section_header:
+            return self.styles['SCQAHeader']
+        if self.blockquote_depth:
+            return self.styles['Callout']
+        if self.list_item_depth:
+            return self.styles['BeautifulBullet']
+        if any(keyword in text.lower() for keyword in METADATA_KEYWORDS):
+            return self.styles['Metadata']
+        return self.styles['BeautifulBody']
+
+    def _add_code_block(self, code):
+        code = code.rstrip('\n')
+        if not code:
+            return
+        markup = escape(code).replace('\n', '<br/>').replace('  ', '&nbsp; ')
+        self.story.append(Paragraph(f'<font face="Courier">{markup}</font>', self.styles['Callout']))
+
+    def _add_rule(self):
+        theme_colors = self.pdf_generator.themes.get(self.pdf_generator.theme, self.pdf_generator.themes['professional'])
+        line_drawing = Drawing(400, 10)
+        line_drawing.add(Line(0, 5, 400, 5, strokeColor=theme_colors['accent_color'], strokeWidth=1))
+        self.story.append(line_drawing)
+        self.story.append(Spacer(1, 10))
+
+    def _add_table(self, rows):
+        rows = [row for row in rows if row]
+        if not rows:
+            return
+        theme_colors = self.pdf_generator.themes.get(self.pdf_generator.theme, self.pdf_generator.themes['professional'])
+        column_count = max(len(row) for row in rows)
+        for row in rows:
+            row.extend(Paragraph('', self.styles['BeautifulBody']) for _ in range(column_count - len(row)))
+
+        table = Table(rows, repeatRows=1, hAlign='LEFT')
+        table.setStyle(TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, theme_colors['dark_gray']),
+            ('BACKGROUND', (0, 0), (-1, 0), theme_colors['light_gray']),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]))
+        self.story.append(Spacer(1, 6))
+        self.story.append(table)
+        self.story.append(Spacer(1, 6))
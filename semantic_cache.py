@@ -0,0 +1,171 @@
+"""
+Semantic response cache backed by a Redis Stack vector index.
+Answers to text-only messages are stored with the message embedding so a close
+paraphrase in the same chat, following the same assistant turn, can reuse the answer
+instead of calling the model again.
+"""
+
+import hashlib
+import os
+import threading
+from array import array
+from typing import List, Optional
+
+from config import redis_client, enable_llm_cache
+
+try:
+    from redis.commands.search.field import TagField, TextField, VectorField
+    from redis.commands.search.query import Query
+    from redis.exceptions import ResponseError
+    try:
+        from redis.commands.search.index_definition import IndexDefinition, IndexType
+    except ImportError:
+        # redis-py < 6 names the module indexDefinition
+        from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+except ImportError:
+    Query = None
+
+
+# Cosine distance under which a cached prompt counts as the same question
+SEMANTIC_CACHE_DISTANCE = float(os.getenv('SEMANTIC_CACHE_DISTANCE', '0.08'))
+SEMANTIC_CACHE_TTL = 24 * 60 * 60
+# Dimension of get_embedding's model (text-embedding-ada-002)
+SEMANTIC_CACHE_DIM = int(os.getenv('SEMANTIC_CACHE_DIM', '1536'))
+
+# Routes whose answers don't depend on tool calls and are safe to reuse
+SEMANTIC_CACHE_ROUTES = frozenset({'chitchat', 'writing'})
+
+# Index and key prefix are partitioned by embedding size so a model change never mixes vectors.
+# v2 added the context tag; entries under the old prefix simply expire.
+INDEX_NAME = f"idx:semantic_cache:v2:{SEMANTIC_CACHE_DIM}"
+KEY_PREFIX = f"semcache:v2:{SEMANTIC_CACHE_DIM}:"
+
+_index_ready = False
+_index_lock = threading.Lock()
+
+
+def semantic_cache_enabled() -> bool:
+    return redis_client is not None and enable_llm_cache and Query is not None
+
+
+def normalize_prompt(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def conversation_context(assistant_messages: List[dict]) -> str:
+    """
+    Identify the turn a prompt follows, so follow-ups like "make it shorter" only match
+    earlier prompts that were asked after the same assistant reply.
+
+    Args:
+        assistant_messages: Recent assistant messages, newest first
+
+    Returns:
+        A short hash of the newest assistant message, or 'none' at the start of a chat
+    """
+    if not assistant_messages:
+        return 'none'
+    last_reply = assistant_messages[0].get('message') or ''
+    return hashlib.sha256(last_reply.encode()).hexdigest()[:16]
+
+
+def _ensure_index() -> None:
+    """Create the HNSW vector index on first use."""
+    global _index_ready
+    if _index_ready:
+        return
+    with _index_lock:
+        if _index_ready:
+            return
+        try:
+            redis_client.ft(INDEX_NAME).create_index(
+                [
+                    TagField('chat_id'),
+                    TagField('context'),
+                    TextField('prompt'),
+                    TextField('response'),
+                    VectorField('v', 'HNSW', {
+                        'TYPE': 'FLOAT32',
+                        'DIM': SEMANTIC_CACHE_DIM,
+                        'DISTANCE_METRIC': 'COSINE'
+                    })
+                ],
+                definition=IndexDefinition(prefix=[KEY_PREFIX], index_type=IndexType.HASH)
+            )
+        except ResponseError as e:
+            if 'Index already exists' not in str(e):
+                raise
+        _index_ready = True
+
+
+def _to_blob(embedding: List[float]) -> bytes:
+    return array('f', embedding).tobytes()
+
+
+def lookup_cached_response(chat_id: str, context: str, embedding: List[float]) -> Optional[str]:
+    """
+    Return the cached answer to the closest earlier prompt in this chat and context, if one
+    is within SEMANTIC_CACHE_DISTANCE of the embedding.
+
+    Args:
+        chat_id: Chat the message belongs to; answers are never shared across chats
+        context: conversation_context() of the turn the prompt follows
+        embedding: Embedding of the normalized prompt
+
+    Returns:
+        The cached response text, or None on a miss or any cache error
+    """
+    if not semantic_cache_enabled() or len(embedding) != SEMANTIC_CACHE_DIM:
+        return None
+    try:
+        _ensure_index()
+        query = (
+            Query("@chat_id:{$chat_id} @context:{$context} @v:[VECTOR_RANGE $radius $vec]=>{$YIELD_DISTANCE_AS: distance}")
+            .sort_by('distance')
+            .return_fields('response', 'distance')
+            .paging(0, 1)
+            .dialect(2)
+        )
+        result = redis_client.ft(INDEX_NAME).search(query, query_params={
+            'chat_id': chat_id,
+            'context': context,
+            'radius': SEMANTIC_CACHE_DISTANCE,
+            'vec': _to_blob(embedding)
+        })
+        if not result.docs:
+            return None
+        response = result.docs[0].response
+        return response.decode() if isinstance(response, bytes) else response
+    except Exception as e:
+        print(f"Semantic cache lookup failed: {e}")
+        return None
+
+
+def store_cached_response(chat_id: str, context: str, prompt: str, embedding: List[float], response: str) -> None:
+    """
+    Store a prompt/response pair with its embedding for SEMANTIC_CACHE_TTL seconds.
+
+    Args:
+        chat_id: Chat the message belongs to
+        context: conversation_context() of the turn the prompt follows
+        prompt: The normalized prompt text
+        embedding: Embedding of the normalized prompt
+        response: The assistant's answer
+    """
+    if not semantic_cache_enabled() or not response or len(embedding) != SEMANTIC_CACHE_DIM:
+        return
+    try:
+        _ensure_index()
+        key = KEY_PREFIX + hashlib.sha256(f"{chat_id}|{context}|{prompt}".encode()).hexdigest()
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            'chat_id': chat_id,
+            'context': context,
+            'prompt': prompt,
+            'response': response,
+            'v': _to_blob(embedding)
+        })
+        pipe.expire(key, SEMANTIC_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        print(f"Semantic cache write failed: {e}")
@@ -1,6 +1,5 @@
 import asyncio
 import json
-import markdown2
 import os
 import re
 import requests
@@ -9,19 +8,32 @@ import time
 import threading
 
 from bs4 import BeautifulSoup
-from config import slack_bot_token, slack_client, names_table, channels_table, image_bucket_name
+from config import slack_bot_token, slack_client, names_table, channels_table, image_bucket_name, http_session
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from slack_sdk.rtm_v2 import RTMClient
 from urllib.parse import urlparse, unquote
 
 from storage import (
-    get_users, get_channels
+    get_users, get_channels, fast_json_dumps, fast_json_loads
 )
 
 from media_processing import transcribe_multiple_urls, download_and_read_file, upload_image_to_s3
 from prompts import prompts
 
+# Display names become single tokens: spaces to underscores, dots dropped
+DISPLAY_NAME_TABLE = str.maketrans({' ': '_', '.': None})
+
+
+def normalize_display_name(display_name):
+    return display_name.translate(DISPLAY_NAME_TABLE).strip()
+
+
+# Markdown image, e.g. ![alt](url)
+MARKDOWN_IMAGE_RE = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+# A line that is nothing but a link to an image file
+STANDALONE_IMAGE_URL_RE = re.compile(r'^https?://[^\s]+\.(jpg|jpeg|png|gif|webp|bmp|svg)(\?[^\s]*)?$', re.IGNORECASE)
+
 def convert_markdown_to_slack(content):
     # Convert bold text
     content = re.sub(r"\*\*(.*?)\*\*", r"*\1*", content)
@@ -101,8 +113,8 @@ def convert_to_slack_blocks(markdown_text):
             continue
         
         # Handle markdown images
-        image_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
-        if re.match(image_pattern, line.strip()):
+        match = MARKDOWN_IMAGE_RE.match(line.strip())
+        if match:
             # Flush current section
             if current_section:
                 blocks.append({
@@ -115,7 +127,6 @@ def convert_to_slack_blocks(markdown_text):
                 current_section = []
             
             # Extract alt text and URL
-            match = re.match(image_pattern, line.strip())
             alt_text = match.group(1) or "Image"
             image_url = match.group(2)
             
@@ -128,8 +139,7 @@ def convert_to_slack_blocks(markdown_text):
             continue
         
         # Handle standalone image URLs
-        standalone_url_pattern = r'^https?://[^\s]+\.(jpg|jpeg|png|gif|webp|bmp|svg)(\?[^\s]*)?$'
-        if re.match(standalone_url_pattern, line.strip(), re.IGNORECASE):
+        if STANDALONE_IMAGE_URL_RE.match(line.strip()):
             # Flush current section
             if current_section:
                 blocks.append({
@@ -270,10 +280,11 @@ def convert_to_slack_blocks(markdown_text):
             }
         })
 
-    return json.dumps(blocks)
+    return fast_json_dumps(blocks)
 
 def send_slack_message(message, channel, ts=None):
     import re
+    import markdown2
     
     # Slack Bot URL
     url = "https://slack.com/api/chat.postMessage"
@@ -282,11 +293,8 @@ def send_slack_message(message, channel, ts=None):
     slack_blocks = convert_to_slack_blocks(message)
     
     # Check if message contains inline images (markdown or standalone URLs)
-    markdown_image_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
-    standalone_url_pattern = r'^https?://[^\s]+\.(jpg|jpeg|png|gif|webp|bmp|svg)(\?[^\s]*)?$'
-    
-    has_inline_images = bool(re.search(markdown_image_pattern, message)) or \
-                       any(re.match(standalone_url_pattern, line.strip(), re.IGNORECASE)
+    has_inline_images = bool(MARKDOWN_IMAGE_RE.search(message)) or \
+                       any(STANDALONE_IMAGE_URL_RE.match(line.strip())
                            for line in message.split('\n'))
     
     # Message data
@@ -380,7 +388,7 @@ def send_slack_message(message, channel, ts=None):
         print(f"[DEBUG] Text length: {len(text_message)}")
         print(f"[DEBUG] Payload size: {payload_size} bytes")
         
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = http_session.post(url, headers=headers, json=data, timeout=30)
         
         # Check HTTP status
         if response.status_code != 200:
@@ -445,7 +453,7 @@ def send_audio_to_slack(text, chat_id=None, ts=None):
         "length": file_size
     }
     
-    response = requests.get(
+    response = http_session.get(
         "https://slack.com/api/files.getUploadURLExternal",
         headers=headers,
         params=url_params
@@ -464,7 +472,7 @@ def send_audio_to_slack(text, chat_id=None, ts=None):
         files = {
             "file": (file_name, file, "audio/mpeg")
         }
-        upload_response = requests.post(upload_url, files=files)
+        upload_response = http_session.post(upload_url, files=files)
     
     if not upload_response.ok:
         print(f"Error uploading file: {upload_response.status_code}")
@@ -484,7 +492,7 @@ def send_audio_to_slack(text, chat_id=None, ts=None):
     if ts:
         complete_data["thread_ts"] = ts
     
-    complete_response = requests.post(
+    complete_response = http_session.post(
         "https://slack.com/api/files.completeUploadExternal",
         headers={
             "Authorization": f"Bearer {slack_bot_token}",
@@ -501,27 +509,31 @@ def send_audio_to_slack(text, chat_id=None, ts=None):
     
     return complete_response.json()
 
-def send_file_to_slack(file_path, chat_id, title, ts=None):
+def send_file_to_slack(file_path, chat_id, title, ts=None, file_name=None):
     """
     Uploads a file to a specified Slack channel using the external upload API.
     If the file_path is a URL, downloads the file first.
     
     Parameters:
-    - file_path: The path to the file or a URL
+    - file_path: The path to the file, a URL, or an in-memory BytesIO
     - chat_id: The ID of the Slack channel where the file will be uploaded
     - title: The title of the file
     - ts: The thread timestamp (optional)
+    - file_name: The file name to upload a BytesIO under (defaults to title)
     
     Returns:
     - dict: The JSON response from the files.completeUploadExternal API
     """
+    # In-memory files are uploaded as they are, without touching disk
+    is_buffer = hasattr(file_path, 'getbuffer')
+    
     # Check if file_path is a URL
-    parsed_url = urlparse(file_path)
-    is_url = parsed_url.scheme in ('http', 'https')
+    parsed_url = None if is_buffer else urlparse(file_path)
+    is_url = parsed_url is not None and parsed_url.scheme in ('http', 'https')
     
     if is_url:
         # Download the file into a temporary file
-        response = requests.get(file_path)
+        response = http_session.get(file_path)
         response.raise_for_status()  # Ensure the download succeeded
         suffix = os.path.splitext(parsed_url.path)[1]  # Extract the file extension
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
@@ -532,8 +544,12 @@ def send_file_to_slack(file_path, chat_id, title, ts=None):
 
     try:
         # Get file details
-        file_size = os.path.getsize(file_to_upload)
-        file_name = os.path.basename(file_to_upload)
+        if is_buffer:
+            file_size = file_path.getbuffer().nbytes
+            file_name = file_name or title
+        else:
+            file_size = os.path.getsize(file_to_upload)
+            file_name = os.path.basename(file_to_upload)
         
         # Step 1: Get upload URL
         headers = {
@@ -546,7 +562,7 @@ def send_file_to_slack(file_path, chat_id, title, ts=None):
             "length": file_size
         }
         
-        response = requests.get(
+        response = http_session.get(
             "https://slack.com/api/files.getUploadURLExternal",
             headers=headers,
             params=url_params
@@ -561,16 +577,19 @@ def send_file_to_slack(file_path, chat_id, title, ts=None):
         file_id = response.json()["file_id"]
         
         # Step 2: Upload file to the provided URL
-        with open(file_to_upload, "rb") as file:
-            # Determine content type based on file extension
-            import mimetypes
-            file_extension = os.path.splitext(file_to_upload)[1].lower()
-            content_type = mimetypes.guess_type(file_to_upload)[0] or "application/octet-stream"
-            
-            files = {
-                "file": (file_name, file, content_type)
-            }
-            upload_response = requests.post(upload_url, files=files)
+        # Determine content type based on file extension
+        import mimetypes
+        content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        
+        if is_buffer:
+            file_path.seek(0)
+            upload_response = http_session.post(upload_url, files={"file": (file_name, file_path, content_type)})
+        else:
+            with open(file_to_upload, "rb") as file:
+                files = {
+                    "file": (file_name, file, content_type)
+                }
+                upload_response = http_session.post(upload_url, files=files)
         
         if not upload_response.ok:
             print(f"Error uploading file: {upload_response.status_code}")
@@ -588,7 +607,7 @@ def send_file_to_slack(file_path, chat_id, title, ts=None):
         if ts:
             complete_data["thread_ts"] = ts
         
-        complete_response = requests.post(
+        complete_response = http_session.post(
             "https://slack.com/api/files.completeUploadExternal",
             headers={
                 "Authorization": f"Bearer {slack_bot_token}",
@@ -617,7 +636,7 @@ def update_slack_users():
         'Content-Type': 'application/x-www-form-urlencoded'
     }
 
-    response = requests.get(url, headers=headers)
+    response = http_session.get(url, headers=headers)
     if response.status_code == 200:
         users_list = response.json().get('members', [])
         for user in users_list:
@@ -661,7 +680,7 @@ def update_slack_conversations():
         'types': 'public_channel,private_channel'
     }
 
-    response = requests.get(url, headers=headers, params=params)
+    response = http_session.get(url, headers=headers, params=params)
     if response.status_code == 200:
         conversations_list = response.json().get('channels', [])
         for channel in conversations_list:
@@ -717,7 +736,7 @@ def get_slack_user_name(user_id):
         'user': user_id
     }
     
-    response = requests.get(url, headers=headers, params=params)
+    response = http_session.get(url, headers=headers, params=params)
     if response.status_code == 200:
         user_info = response.json()
         if user_info.get('ok'):
@@ -762,10 +781,10 @@ def message_to_json(message_string):
     
     message = {
         "assistant": f"{message_parts[0].strip()} {message_parts[2].strip()}",
-        "blocks": json.loads(message_parts[1])['blocks']
+        "blocks": fast_json_loads(message_parts[1])['blocks']
     }
     
-    return json.dumps(message)
+    return fast_json_dumps(message)
 
 def find_image_urls(data):
     """
@@ -811,8 +830,7 @@ def process_slack_event(slack_event):
         # Retrieve the name of the user         
         user = get_users(user_id)
         user_name = user['real_name']
-        display_name = user['display_name']
-        display_name = display_name.replace(' ', '_').replace('.', '').strip()
+        display_name = normalize_display_name(user['display_name'])
         
         # Get message text
         try:
@@ -10,6 +10,11 @@ import calendar
 from config import dynamodb, weaviate_client, names_table, channels_table, meetings_table, assistant_table, user_table
 from weaviate.classes.query import Filter, Sort
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # Function to convert non-serializable types for JSON serialization
 def decimal_default(obj):
@@ -20,6 +25,22 @@ def decimal_default(obj):
     raise TypeError("Unserializable object {} of type {}".format(obj, type(obj)))
 
 
+def fast_json_loads(data):
+    """Parse JSON with orjson when it is installed, falling back to the stdlib."""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def fast_json_dumps(obj, default=None):
+    """Serialize to a JSON string with orjson when it is installed, falling back to the stdlib."""
+    if orjson:
+        try:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # orjson rejects some values the stdlib accepts, e.g. integers beyond 64 bits
+            pass
+    return json.dumps(obj, default=default)
+
+
 def transform_objects(objects, collection_name):
     transformed_list = []
 
@@ -208,6 +229,40 @@ def get_message_by_sort_id(role, chat_id, sort_id):
         return None
 
 
+def get_messages_by_sort_ids(role, chat_id, sort_ids):
+    """Fetch several messages by sort ID in one query; returns {sort_id: message}."""
+    try:
+        # Determine the appropriate collection based on the role
+        if role == "user":
+            collection = weaviate_client.collections.get('UserMessages')
+        elif role == "assistant":
+            collection = weaviate_client.collections.get('AssistantMessages')
+        else:
+            return {}  # Handle unexpected roles
+
+        timestamps = {
+            datetime.datetime.fromtimestamp(int(sort_id), datetime.timezone.utc).isoformat(): int(sort_id)
+            for sort_id in sort_ids[:100]
+        }
+        if not timestamps:
+            return {}
+
+        filters = Filter.by_property("chat_id").equal(chat_id) & Filter.any_of([
+            Filter.by_property("timestamp").equal(timestamp_iso) for timestamp_iso in timestamps
+        ])
+        response = collection.query.fetch_objects(filters=filters, limit=len(timestamps))
+
+        messages = {sort_id: None for sort_id in timestamps.values()}
+        for obj in response.objects:
+            sort_id = calendar.timegm(obj.properties['timestamp'].utctimetuple())
+            if sort_id in messages:
+                messages[sort_id] = obj.properties.get('message')
+        return messages
+    except Exception as e:
+        print(f"Error retrieving messages by sort IDs: {e}")
+        return {}
+
+
 def get_messages_in_range(chat_id, start_sort_id, end_sort_id):
     try:
         # Retrieve user and assistant messages
@@ -247,13 +302,23 @@ def get_messages_in_range(chat_id, start_sort_id, end_sort_id):
         return []
 
 
+# Single-user lookups run on every event; names rarely change, so found users are kept this long
+USER_CACHE_TTL = 300
+_user_cache = {}
+
+
 def get_users(user_id=None):
     try:
         if user_id:
+            cached = _user_cache.get(user_id)
+            if cached and time.monotonic() - cached[0] < USER_CACHE_TTL:
+                return cached[1]
+
             # Retrieve a single user
             response = names_table.get_item(Key={'user_id': user_id})
             item = response.get('Item', None)
             if item:
+                _user_cache[user_id] = (time.monotonic(), item)
                 return item
             else:
                 from slack_integration import update_slack_users
@@ -261,6 +326,7 @@ def get_users(user_id=None):
                 response = names_table.get_item(Key={'user_id': user_id})
                 item = response.get('Item', None)
                 if item:
+                    _user_cache[user_id] = (time.monotonic(), item)
                     return item
                 else:
                     print(user_id, " still not found after update.")
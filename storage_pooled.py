@@ -5,6 +5,7 @@ This module provides pooled versions of storage functions for better performance
 
 import datetime
 import json
+import threading
 import time
 from decimal import Decimal
 from typing import List, Dict, Any, Optional
@@ -12,7 +13,7 @@ from typing import List, Dict, Any, Optional
 from boto3.dynamodb.conditions import Key
 from bson import ObjectId
 import calendar
-from config import dynamodb, weaviate_url, weaviate_api_key, headers, names_table, channels_table, meetings_table, assistant_table, user_table
+from config import dynamodb, weaviate_url, weaviate_api_key, weaviate_additional_config, headers, names_table, channels_table, meetings_table, assistant_table, user_table
 from weaviate.classes.query import Filter, Sort
 from connection_pool import get_weaviate_pool
 from parallel_utils import time_operation_with_metrics
@@ -30,11 +31,26 @@ def init_weaviate_pool(pool_size: int = 5, max_overflow: int = 2):
             api_key=weaviate_api_key,
             headers=headers,
             pool_size=pool_size,
-            max_overflow=max_overflow
+            max_overflow=max_overflow,
+            additional_config=weaviate_additional_config
         )
     return weaviate_pool
 
 
+def warm_weaviate_pool(pool_size: int = 5, max_overflow: int = 2):
+    """
+    Build the Weaviate connection pool on a background thread so module import does not wait on it.
+    Callers that need the pool before warm-up finishes block in get_weaviate_pool until it is ready.
+    """
+    def _warm():
+        try:
+            init_weaviate_pool(pool_size=pool_size, max_overflow=max_overflow)
+        except Exception as e:
+            print(f"Error warming Weaviate connection pool: {e}")
+
+    threading.Thread(target=_warm, name="weaviate-pool-warmup", daemon=True).start()
+
+
 # Import original functions from storage
 from storage import (
     decimal_default, transform_objects, save_message, 
@@ -194,6 +210,48 @@ def get_message_by_sort_id_pooled(role, chat_id, sort_id):
         return None
 
 
+@time_operation_with_metrics("pooled_get_messages_by_sort_ids")
+def get_messages_by_sort_ids_pooled(role, chat_id, sort_ids):
+    """
+    Get several messages by sort_id in one query using connection pool.
+    Returns {sort_id: transformed message or None}.
+    """
+    # Ensure pool is initialized
+    pool = init_weaviate_pool()
+    
+    try:
+        with pool.get_client() as client:
+            # Determine the appropriate collection based on the role
+            if role == "user":
+                collection = client.collections.get('UserMessages')
+            elif role == "assistant":
+                collection = client.collections.get('AssistantMessages')
+            else:
+                return {}  # Handle unexpected roles
+
+            timestamps = [
+                datetime.datetime.fromtimestamp(int(sort_id), datetime.timezone.utc).isoformat()
+                for sort_id in sort_ids[:100]
+            ]
+            if not timestamps:
+                return {}
+
+            # One query for every requested sort_id instead of one round trip each
+            filters = Filter.by_property("chat_id").equal(chat_id) & Filter.any_of([
+                Filter.by_property("timestamp").equal(timestamp_iso) for timestamp_iso in timestamps
+            ])
+            response = collection.query.fetch_objects(filters=filters, limit=len(timestamps))
+
+            messages = {int(sort_id): None for sort_id in sort_ids[:100]}
+            for message in transform_objects(response.objects, collection.name):
+                if message['sort_key'] in messages:
+                    messages[message['sort_key']] = message
+            return messages
+    except Exception as e:
+        print(f"Error retrieving messages by sort_ids: {e}")
+        return {}
+
+
 @time_operation_with_metrics("pooled_get_messages_in_range")
 def get_messages_in_range_pooled(role, chat_id, start_sort_id, end_sort_id):
     """
@@ -299,6 +357,7 @@ def create_pooled_storage_functions():
         'get_last_messages_weaviate': get_last_messages_weaviate_pooled,
         'get_relevant_messages': get_relevant_messages_pooled,
         'get_message_by_sort_id': get_message_by_sort_id_pooled,
+        'get_messages_by_sort_ids': get_messages_by_sort_ids_pooled,
         'get_messages_in_range': get_messages_in_range_pooled,
         'batch_save_messages_weaviate': batch_save_messages_weaviate_pooled
     }
@@ -125,6 +125,34 @@ tools = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_messages_by_sort_ids",
+            "description": "Retrieves several specific messages at once based on their sort key identifiers. Prefer this over calling get_message_by_sort_id repeatedly when more than one past message needs to be recalled, as all messages are fetched in a single lookup.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "role": {
+                        "type": "string",
+                        "description": "The role of the entity that sent the messages, either user or assistant."
+                    },
+                    "sort_ids": {
+                        "type": "array",
+                        "items": {
+                            "type": "number"
+                        },
+                        "description": "The sort key identifiers of the messages to retrieve (up to 100)."
+                    },
+                    "chat_id": {
+                        "type": "string",
+                        "description": "The unique chat key identifier of the messages to retrieve. It corresponds to a group of messages in the chat history."
+                    }
+                },
+                "required": ["role", "chat_id", "sort_ids"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -371,13 +399,13 @@ tools = [
         "type": "function",
         "function": {
             "name": "solve_maths",
-            "description": "Executes the provided Python code with the given parameters and returns the result.",
+            "description": "Evaluates the provided Python maths code with the given parameters and returns the resulting variables. Only assignments and arithmetic expressions using numbers, the math module (e.g. math.sqrt, math.pi) and abs, round, min, max, sum, pow, int and float are supported; imports, loops and function definitions are not. The value of a final bare expression is returned as 'result'.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "code": {
                         "type": "string",
-                        "description": "The Python code to be executed."
+                        "description": "The Python maths code to be evaluated."
                     },
                     "params": {
                         "type": "object",